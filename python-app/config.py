@@ -1,6 +1,19 @@
+import functools
 import os
 from typing import Optional
 
+
+def _parse_cors_origins(value: str) -> tuple:
+    """Split a comma-separated origin list, collapsing any wildcard to ("*",)"""
+    origins = tuple(origin.strip() for origin in value.split(",") if origin.strip())
+    return ("*",) if "*" in origins else origins
+
+
+def _parse_temperatures(value: str) -> tuple:
+    """Split a comma-separated temperature list; later values are fallbacks for windows that fail to decode well"""
+    return tuple(float(temperature) for temperature in value.split(",") if temperature.strip())
+
+
 class Config:
     """Application configuration"""
     
@@ -10,10 +23,46 @@ class Config:
     
     # Whisper model settings
     WHISPER_DEVICE: str = os.getenv("WHISPER_DEVICE", "cpu")
-    WHISPER_COMPUTE_TYPE: str = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+    # Compute type per device: int8 on CPU, int8 weights with float16
+    # activations on GPU. WHISPER_COMPUTE_TYPE, when set, applies to both
+    # unless a device-specific variable overrides it.
+    WHISPER_COMPUTE_TYPE: Optional[str] = os.getenv("WHISPER_COMPUTE_TYPE")
+    WHISPER_COMPUTE_TYPE_CPU: str = os.getenv("WHISPER_COMPUTE_TYPE_CPU", WHISPER_COMPUTE_TYPE or "int8")
+    WHISPER_COMPUTE_TYPE_GPU: str = os.getenv("WHISPER_COMPUTE_TYPE_GPU", WHISPER_COMPUTE_TYPE or "int8_float16")
+    # CPU threads per loaded model; 0 keeps faster-whisper's default (4, or
+    # OMP_NUM_THREADS when set). Any other value overrides OMP_NUM_THREADS, so
+    # size it to the CPUs actually available to the container.
+    WHISPER_CPU_THREADS: int = int(os.getenv("WHISPER_CPU_THREADS", "0"))
+    # Maximum number of loaded models kept in memory for reuse; 1 frees the
+    # previous model on a switch, larger values trade memory for fast toggling
+    MODEL_POOL_SIZE: int = int(os.getenv("MODEL_POOL_SIZE", "1"))
+    # Maximum number of transcription requests handed to the service at once;
+    # the model runs one at a time, so the rest wait their turn for it
+    TRANSCRIBE_MAX_QUEUED: int = int(os.getenv("TRANSCRIBE_MAX_QUEUED", "4"))
+    
+    # Decoding settings; greedy decoding without conditioning on the previous
+    # text is the low-latency default for short dictation clips
+    WHISPER_BEAM_SIZE: int = int(os.getenv("WHISPER_BEAM_SIZE", "1"))
+    WHISPER_CONDITION_PREV: bool = os.getenv("WHISPER_CONDITION_PREV", "false").lower() in ("true", "1", "yes", "on")
+    # faster-whisper's fallback schedule: decoding starts at 0.0 and retries
+    # hotter when the compression ratio or log probability check fails
+    WHISPER_TEMPERATURE: tuple = _parse_temperatures(os.getenv("WHISPER_TEMPERATURE", "0.0,0.2,0.4,0.6,0.8,1.0"))
+    
+    # Speech chunks decoded together per request (faster-whisper 1.1+ only;
+    # 1 disables batching). Batching needs a single temperature and
+    # WHISPER_CONDITION_PREV off; otherwise requests decode sequentially.
+    WHISPER_BATCH_SIZE: int = int(os.getenv("WHISPER_BATCH_SIZE", "1"))
+    
+    # Memory budget for decoded uploads kept for repeated requests (a 30s clip
+    # is about 1.9MB of float32 samples)
+    DECODED_AUDIO_CACHE_BYTES: int = int(os.getenv("DECODED_AUDIO_CACHE_BYTES", str(64 << 20)))
+    
+    # Voice activity detection settings, passed to faster-whisper's VAD filter
+    VAD_THRESHOLD: float = float(os.getenv("VAD_THRESHOLD", "0.5"))
+    VAD_MIN_SILENCE_DURATION_MS: int = int(os.getenv("VAD_MIN_SILENCE_DURATION_MS", "2000"))
     
     # CORS settings
-    CORS_ORIGINS: list = os.getenv("CORS_ORIGINS", "*").split(",")
+    CORS_ORIGINS: tuple = _parse_cors_origins(os.getenv("CORS_ORIGINS", "*"))
     
     # Default language
     DEFAULT_LANGUAGE: str = os.getenv("DEFAULT_LANGUAGE", "en")
@@ -24,7 +73,7 @@ class Config:
     
     # API settings
     API_TITLE: str = os.getenv("API_TITLE", "WhisperX Assistant API")
-    API_VERSION: str = os.getenv("API_VERSION", "1.0.0")
+    API_VERSION: str = os.getenv("API_VERSION", "1.1.0")
     
     # Model storage settings
     ENABLE_EXTERNAL_STORAGE: bool = os.getenv("ENABLE_EXTERNAL_STORAGE", "false").lower() in ("true", "1", "yes", "on")
@@ -36,6 +85,14 @@ class Config:
     TRANSFORMERS_CACHE: Optional[str] = os.getenv("TRANSFORMERS_CACHE", None)
     
     @classmethod
+    def get_compute_type(cls, device: str) -> str:
+        """Get the compute type to load models with on the given device"""
+        return cls.WHISPER_COMPUTE_TYPE_GPU if device.startswith("cuda") else cls.WHISPER_COMPUTE_TYPE_CPU
+    
+    # Settings and volume mounts are fixed at startup, so the result is cached;
+    # call get_effective_cache_dir.cache_clear() after changing them
+    @classmethod
+    @functools.lru_cache(maxsize=1)
     def get_effective_cache_dir(cls) -> Optional[str]:
         """Get the effective cache directory based on configuration priority"""
         if cls.ENABLE_EXTERNAL_STORAGE:
@@ -1,20 +1,80 @@
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
+from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, ORJSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+import asyncio
 import logging
+import os
+import tempfile
 import time
 import json
-from typing import Dict, Any, Optional
+import orjson
+from typing import TYPE_CHECKING, Dict, Any, Optional
 from config import config
-from transcription_service import transcription_service
+from transcription_service import TranscriptionService, get_transcription_service
 from models_service import ModelsService
 
+if TYPE_CHECKING:
+    # Only for annotations; numpy comes in with faster-whisper
+    import numpy as np
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Uploads are copied to the spool file in chunks of this size
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Linux can back the spool file with anonymous memory instead of storage
+_HAS_MEMFD = hasattr(os, "memfd_create")
+
+# Content type prefixes accepted as media uploads
+_AV_PREFIXES = ("audio/", "video/")
+
+# Response layouts for transcription segments: OpenAI-style segment objects,
+# or parallel starts/ends/texts lists
+_SEGMENT_LAYOUTS = ("objects", "columns")
+
+# Admission limit for the transcription service, which serializes inference;
+# requests beyond it wait here instead of piling up on the model lock
+_TRANSCRIBE_SLOTS = asyncio.Semaphore(max(1, config.TRANSCRIBE_MAX_QUEUED))
+
+
+def _open_upload_file():
+    """Open a file to spool an upload into, returning (file, path)"""
+    if _HAS_MEMFD:
+        # Nothing is written back to storage and there is no directory entry
+        # to unlink; the path stays valid until the file is closed
+        fd = os.memfd_create("whisper-upload", os.MFD_CLOEXEC)
+        return os.fdopen(fd, "w+b"), f"/proc/self/fd/{fd}"
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=config.TEMP_FILE_SUFFIX)
+    return temp_file, temp_file.name
+
+
+def _close_upload_file(upload_file, upload_path: str):
+    """Close a spool file from _open_upload_file; closing a memfd releases its memory"""
+    upload_file.close()
+    if not _HAS_MEMFD:
+        try:
+            os.unlink(upload_path)
+        except OSError as e:
+            logger.warning("Failed to delete temp file %s: %s", upload_path, e)
+
+
+async def _stream_transcription(service: TranscriptionService, audio: "np.ndarray", language: str, model: str):
+    """Relay transcription events as server-sent events"""
+    try:
+        async with _TRANSCRIBE_SLOTS:
+            async for event in service.transcribe_stream(audio, language, model):
+                yield b"data: " + orjson.dumps(event) + b"\n\n"
+    except Exception as e:
+        # Headers are already sent, so report the failure as a final event
+        error_msg = f"Transcription failed: {str(e)}"
+        logger.error("TRANSCRIPTION STREAM ERROR: %s", error_msg)
+        yield b"data: " + orjson.dumps({"type": "error", "error": {"message": error_msg}}) + b"\n\n"
+
+
 # Initialize models service
 models_service = ModelsService()
 
@@ -25,7 +85,9 @@ templates = Jinja2Templates(directory="templates")
 app = FastAPI(
     title=config.API_TITLE,
     version=config.API_VERSION,
-    description="A FastAPI service for audio transcription using OpenAI Whisper with support for external model storage"
+    description="A FastAPI service for audio transcription using OpenAI Whisper with support for external model storage",
+    # orjson encodes straight to bytes in C, much faster than the json module
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -40,63 +102,145 @@ app.add_middleware(
 # Mount static files for images
 app.mount("/images", StaticFiles(directory="images"), name="images")
 
+# Background task keeping the model status snapshot warm
+_status_refresh_task: Optional[asyncio.Task] = None
+
+# Background task loading the default transcription model after startup
+_preload_task: Optional[asyncio.Task] = None
+
+
+async def _refresh_models_status_loop():
+    """Periodically rescan downloaded models off the event loop"""
+    while True:
+        try:
+            await asyncio.to_thread(models_service.refresh_models_status)
+        except Exception as e:
+            logger.warning(f"Failed to refresh model status: {str(e)}")
+        await asyncio.sleep(models_service.CACHE_TTL)
+
+
+@app.on_event("startup")
+async def start_models_status_refresh():
+    """Start refreshing the model status snapshot in the background"""
+    global _status_refresh_task
+    _status_refresh_task = asyncio.create_task(_refresh_models_status_loop())
+
+
+async def _preload_transcription_service():
+    """Load the transcription service and its default model in the background"""
+    try:
+        await asyncio.to_thread(get_transcription_service)
+        logger.info("Transcription model preloaded")
+    except Exception as e:
+        # Requests retry the load through get_transcription_service
+        logger.warning(f"Failed to preload the transcription model: {str(e)}")
+
+
+@app.on_event("startup")
+async def start_transcription_service_preload():
+    """Start loading the default model without holding up startup"""
+    global _preload_task
+    _preload_task = asyncio.create_task(_preload_transcription_service())
+
+
+@app.on_event("shutdown")
+async def stop_models_status_refresh():
+    """Stop the background model status refresh"""
+    if _status_refresh_task is not None:
+        _status_refresh_task.cancel()
+
 
 @app.post("/v1/audio/transcriptions")
 async def transcribe_audio(
     file: UploadFile = File(...),
     model: str = Form("base"),  # OpenAI standard parameter name
-    language: str = Form(config.DEFAULT_LANGUAGE)
+    language: str = Form(config.DEFAULT_LANGUAGE),
+    segment_layout: str = Form("objects"),
+    stream: bool = Form(False)
 ):
     """Transcribe audio file to text"""
+    logger.debug(
+        "transcribe_audio file=%s type=%s size=%s model=%s lang=%s",
+        file.filename, file.content_type, getattr(file, "size", None), model, language
+    )
     
-    # Log all parameters received
-    print(f"\n🔍 TRANSCRIBE_AUDIO FUNCTION CALLED:")
-    print(f"   📁 file.filename: {file.filename}")
-    print(f"   📁 file.content_type: {file.content_type}")
-    print(f"   📁 file.size: {getattr(file, 'size', 'unknown')}")
-    print(f"   🤖 model: {model}")
-    print(f"   🌍 language: {language}")
-    print(f"   ⚙️  config.DEFAULT_LANGUAGE: {config.DEFAULT_LANGUAGE}")
-    
+    upload_file = None
     try:
         # Validate file type
-        if not file.content_type or not file.content_type.startswith(('audio/', 'video/')):
-            logger.warning(f"Invalid content type: {file.content_type}")
+        if not file.content_type or not file.content_type.startswith(_AV_PREFIXES):
+            logger.warning("Invalid content type: %s", file.content_type)
             # Allow anyway as some clients might not set proper content type
         
-        # Read file content
-        content = await file.read()
-        actual_size = len(content)
-        print(f"   📊 Actual file content size: {actual_size} bytes")
+        if segment_layout not in _SEGMENT_LAYOUTS:
+            error_msg = f"Invalid segment_layout '{segment_layout}', expected one of: {', '.join(_SEGMENT_LAYOUTS)}"
+            logger.error("TRANSCRIPTION ERROR: %s", error_msg)
+            raise HTTPException(status_code=400, detail=error_msg)
+        
+        if stream and segment_layout != "objects":
+            # Streamed events carry one segment each, so there are no columns to lay out
+            error_msg = "segment_layout is not supported with stream=true"
+            logger.error("TRANSCRIPTION ERROR: %s", error_msg)
+            raise HTTPException(status_code=400, detail=error_msg)
+        
+        # Stream file content to a spool file the model can open by path
+        upload_file, upload_path = _open_upload_file()
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            if _HAS_MEMFD:
+                # Only a copy into memory, cheaper than a thread handoff
+                upload_file.write(chunk)
+            else:
+                # A real storage write; keep it off the event loop
+                await asyncio.to_thread(upload_file.write, chunk)
+        upload_file.flush()
+        actual_size = upload_file.tell()
         
-        if not content:
+        if not actual_size:
             error_msg = "Empty file provided"
-            print(f"   ❌ ERROR: {error_msg}")
-            logger.error(f"TRANSCRIPTION ERROR: {error_msg}")
+            logger.error("TRANSCRIPTION ERROR: %s", error_msg)
             raise HTTPException(status_code=400, detail=error_msg)
         
-        logger.info(f"Processing file: {file.filename}, size: {actual_size} bytes, language: {language}, model: {model}")
+        logger.info("Processing file: %s, size: %d bytes, language: %s, model: %s", file.filename, actual_size, language, model)
         
-        # Log what we're passing to the transcription service
-        print(f"   🔄 Calling transcription_service.transcribe_audio(content_size={actual_size}, language='{language}', model_name='{model}')")
+        # Resolved only once the upload is known to be valid; the first call
+        # loads the default model, so it runs off the event loop
+        try:
+            service = await asyncio.to_thread(get_transcription_service)
+        except Exception as e:
+            error_msg = f"Transcription model unavailable: {str(e)}"
+            logger.error("TRANSCRIPTION ERROR: %s", error_msg)
+            raise HTTPException(status_code=503, detail=error_msg)
+        
+        if stream:
+            # Decode up front, so the spool file is closed here below whether the
+            # stream runs to the end, stops early or never starts; decoding takes
+            # a slot like any transcription, and the stream takes another
+            async with _TRANSCRIBE_SLOTS:
+                audio = await service.decode_path(upload_path)
+            events = _stream_transcription(service, audio, language, model)
+            return StreamingResponse(events, media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
         
         # Transcribe using the service
-        result = await transcription_service.transcribe_audio(content, language, model)
+        async with _TRANSCRIBE_SLOTS:
+            result = await service.transcribe_path(upload_path, language, model, segment_layout=segment_layout)
         
-        print(f"   ✅ Transcription successful: {len(result.get('text', ''))} characters")
-        logger.info(f"Transcription successful: {len(result.get('text', ''))} characters")
-        return result
+        text_length = len(result.get('text', ''))
+        logger.info("Transcription successful: %d characters", text_length)
+        # The result is plain JSON types already; returning the response directly
+        # skips FastAPI's jsonable_encoder walk over every segment
+        return ORJSONResponse(result)
         
     except HTTPException as he:
         # Re-raise HTTP exceptions (these are expected errors)
-        print(f"   ❌ HTTP Exception: {he.status_code} - {he.detail}")
-        logger.error(f"TRANSCRIPTION HTTP ERROR {he.status_code}: {he.detail}")
+        logger.error("TRANSCRIPTION HTTP ERROR %s: %s", he.status_code, he.detail)
         raise he
     except Exception as e:
         error_msg = f"Transcription failed: {str(e)}"
-        print(f"   ❌ Unexpected Exception: {error_msg}")
-        logger.error(f"TRANSCRIPTION UNEXPECTED ERROR: {error_msg}")
+        logger.error("TRANSCRIPTION UNEXPECTED ERROR: %s", error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
+    finally:
+        # Clean up the spool file
+        if upload_file is not None:
+            _close_upload_file(upload_file, upload_path)
 
 @app.get("/v1/health")
 async def health_check():
@@ -113,12 +257,25 @@ async def health_check():
     }
 
 @app.get("/v1/models")
-async def get_models():
+async def get_models(request: Request):
     """Get information about available Whisper models with download status"""
-    return {
-        "available_models": models_service.get_models_with_status(),
-        "downloaded_models": models_service.get_downloaded_models()
+    available_models, etag = await asyncio.to_thread(models_service.get_models_status_snapshot)
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": f"max-age={int(models_service.CACHE_TTL)}"
     }
+    
+    # Let polling clients revalidate without transferring the listing again
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    
+    return ORJSONResponse(
+        content={
+            "available_models": available_models,
+            "downloaded_models": [model["name"] for model in available_models if model["downloaded"]]
+        },
+        headers=headers
+    )
 
 @app.post("/v1/models/{model_name}/download")
 async def download_model(model_name: str):
@@ -127,7 +284,7 @@ async def download_model(model_name: str):
         result = await models_service.download_model(
             model_name,
             device=config.WHISPER_DEVICE,
-            compute_type=config.WHISPER_COMPUTE_TYPE
+            compute_type=config.get_compute_type(config.WHISPER_DEVICE)
         )
         
         if result["success"]:
@@ -140,6 +297,9 @@ async def download_model(model_name: str):
         else:
             raise HTTPException(status_code=400, detail=result["message"])
             
+    except HTTPException:
+        # A failed download is reported as is, not as a server error
+        raise
     except Exception as e:
         logger.error(f"Error in download endpoint for model {model_name}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to download model: {str(e)}")
@@ -148,7 +308,7 @@ async def download_model(model_name: str):
 async def get_downloaded_models():
     """Get list of models that are downloaded locally"""
     return {
-        "downloaded_models": models_service.get_downloaded_models(),
+        "downloaded_models": await models_service.aget_downloaded_models(),
         "total_available": len(models_service.get_available_models())
     }
 
@@ -157,7 +317,7 @@ async def dashboard(request: Request):
     """Serve the dashboard with API information and available models"""
     try:
         # Get available models with download status
-        available_models = models_service.get_models_with_status()
+        available_models = await asyncio.to_thread(models_service.get_models_with_status)
         
         # Prepare template context
         context = {
@@ -1,22 +1,145 @@
 """
 Service for managing Whisper model information
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Callable, Iterator, Mapping, Optional, Tuple
+from types import MappingProxyType
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import hashlib
+import json
 import logging
 import os
+import threading
+import time
 import asyncio
-from pathlib import Path
-from faster_whisper import WhisperModel
 from config import config
 
 logger = logging.getLogger(__name__)
 
+# File suffixes that indicate downloaded model weights (covers model.bin,
+# pytorch_model.bin and CTranslate2 exports)
+_MODEL_SUFFIXES = (".bin", ".safetensors", ".ctranslate2")
+
+# Repository folder names used by the HuggingFace hub/transformers caches
+_REPO_DIR_PATTERNS = (
+    "models--guillaumekln--faster-whisper-{name}",
+    "models--Systran--faster-whisper-{name}",
+    "models--openai--whisper-{name}",
+)
+
+# Plain model folder names placed directly in the HuggingFace cache
+_LOCAL_DIR_PATTERNS = ("{name}", "faster-whisper-{name}")
+
+# Plain model folder names placed in one of the common cache directories
+_PLAIN_DIR_PATTERNS = ("{name}", "whisper-{name}", "faster-whisper-{name}")
+
+# Standard locations that may hold plain model folders
+_STANDARD_CACHE_DIRS = (
+    os.path.expanduser("~/.cache/huggingface"),
+    os.path.expanduser("~/.cache/whisper"),
+    os.path.expanduser("~/.local/share/whisper"),
+    "/tmp/whisper",
+    "./models"  # Local models directory
+)
+
+
+def _expand_templates(cache_base: str, repo_subdirs: Tuple[str, ...],
+                      dir_patterns: Tuple[str, ...]) -> Iterator[Tuple[str, str]]:
+    """Yield (cache root, path template) pairs for a cache directory, with {name} standing for the model name"""
+    # Escape braces so only the {name} placeholder is substituted later
+    base = cache_base.replace("{", "{{").replace("}", "}}")
+    # Only snapshots/<revision>/ holds named weight files in a HuggingFace
+    # repo folder; blobs/ holds the same content under hash names
+    for subdir in repo_subdirs:
+        for pattern in _REPO_DIR_PATTERNS:
+            yield cache_base, os.path.join(base, subdir, pattern, "snapshots")
+    for pattern in dir_patterns:
+        yield cache_base, os.path.join(base, pattern)
+
+
+@functools.lru_cache(maxsize=64)
+def _expand_model_paths(model_name: str, path_templates: Tuple[Tuple[str, str], ...]) -> Tuple[Tuple[str, str], ...]:
+    """Substitute a model name into (cache root, path template) pairs"""
+    # Plain strings go straight to os.path.isdir/os.scandir without pathlib overhead
+    return tuple((root, template.format(name=model_name)) for root, template in path_templates)
+
+
+def _has_model_file(root) -> bool:
+    """Check if any model weight file exists below root, stopping at the first match"""
+    stack = [root]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        try:
+            for entry in entries:
+                # Match on the name first so non-matching entries never need a stat;
+                # is_file() follows symlinks because HF snapshots link into blobs/
+                if entry.name.endswith(_MODEL_SUFFIXES) and entry.is_file():
+                    return True
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+        finally:
+            entries.close()
+    return False
+
+
+class ModelPool:
+    """Thread-safe LRU pool of loaded Whisper models keyed by (model_name, device, compute_type)"""
+    
+    def __init__(self, max_size: int = 1):
+        """Initialize the pool, keeping at most max_size models loaded"""
+        self.max_size = max_size
+        self._models: "OrderedDict[Tuple[str, str, str], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, model_name: str, device: str, compute_type: str) -> Optional[Any]:
+        """Get a pooled model, marking it as most recently used"""
+        key = (model_name, device, compute_type)
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+            return model
+    
+    def put(self, model_name: str, device: str, compute_type: str, model: Any):
+        """Add a loaded model, evicting the least recently used ones beyond max_size"""
+        key = (model_name, device, compute_type)
+        with self._lock:
+            self._models[key] = model
+            self._models.move_to_end(key)
+            while len(self._models) > self.max_size:
+                evicted_key, _ = self._models.popitem(last=False)
+                logger.info(f"Evicted model {evicted_key} from the model pool")
+    
+    def acquire(self, model_name: str, device: str, compute_type: str, loader: Callable[..., Any]) -> Any:
+        """Get a pooled model, loading it with loader(model_name, device=..., compute_type=...) on a miss"""
+        model = self.get(model_name, device, compute_type)
+        if model is None:
+            # Load outside the lock, loading weights can take seconds
+            model = loader(model_name, device=device, compute_type=compute_type)
+            self.put(model_name, device, compute_type, model)
+        return model
+    
+    def clear(self):
+        """Drop all pooled models"""
+        with self._lock:
+            self._models.clear()
+
+
+# Global pool of the models loaded by the transcription service
+model_pool = ModelPool(config.MODEL_POOL_SIZE)
+
+
 class ModelsService:
     """Service for handling Whisper model information"""
     
     # Available Whisper models with their approximate sizes and descriptions
     # Based on faster-whisper supported models: https://github.com/SYSTRAN/faster-whisper
-    AVAILABLE_MODELS = [
+    # Entries are read-only views so they can be handed out without copying
+    AVAILABLE_MODELS = tuple(MappingProxyType(model) for model in [
         {
             "name": "tiny",
             "size": "~39 MB",
@@ -73,44 +196,82 @@ class ModelsService:
             "relative_speed": "~1x",
             "vram_required": "~10 GB"
         }
-    ]
+    ])
+    
+    # Model entries indexed by name for constant-time lookups
+    _BY_NAME = {model["name"]: model for model in AVAILABLE_MODELS}
+    _MODEL_NAMES = frozenset(_BY_NAME)
+    
+    # How long (in seconds) a download-status check stays valid before the
+    # filesystem is scanned again
+    CACHE_TTL = 30.0
     
     def __init__(self):
         """Initialize the models service"""
-        self._setup_cache_environment()
+        self._downloaded_cache: Dict[str, Tuple[float, bool]] = {}
+        # (timestamp, models with status, etag) of the last status listing
+        self._status_snapshot: Optional[Tuple[float, List[Dict[str, Any]], str]] = None
+        # Cache roots found on disk; missing roots rarely appear at runtime, so
+        # this is only recomputed after downloads and background refreshes
+        self._live_roots: Optional[frozenset] = None
+        self._load_config()
         logger.info(f"Models service initialized")
         logger.info(f"External storage enabled: {config.ENABLE_EXTERNAL_STORAGE}")
-        if config.ENABLE_EXTERNAL_STORAGE:
-            effective_cache_dir = config.get_effective_cache_dir()
-            logger.info(f"Effective cache directory: {effective_cache_dir}")
+        if self._effective_cache_dir:
+            logger.info(f"Effective cache directory: {self._effective_cache_dir}")
+    
+    def _load_config(self):
+        """Resolve the cache locations from the current configuration"""
+        self._effective_cache_dir = config.get_effective_cache_dir() if config.ENABLE_EXTERNAL_STORAGE else None
+        self._setup_cache_environment()
+        # The cache locations only depend on configuration and the environment
+        # prepared above, so resolve them once instead of on every check
+        self._common_cache_dirs = self._build_common_cache_dirs()
+        self._path_templates = self._build_path_templates()
+    
+    def reload_config(self):
+        """Re-resolve the cache locations after the configuration has changed"""
+        config.get_effective_cache_dir.cache_clear()
+        self._load_config()
+        self.refresh_cache_roots()
+        self.invalidate_download_cache()
     
     def _setup_cache_environment(self):
         """Setup cache environment variables for external storage"""
-        if config.ENABLE_EXTERNAL_STORAGE:
-            effective_cache_dir = config.get_effective_cache_dir()
-            if effective_cache_dir:
-                # Set HuggingFace environment variables to use external storage
-                os.environ["HF_HOME"] = effective_cache_dir
-                os.environ["TRANSFORMERS_CACHE"] = effective_cache_dir
-                logger.info(f"Set cache environment variables to: {effective_cache_dir}")
-                
-                # Ensure the directory exists
-                Path(effective_cache_dir).mkdir(parents=True, exist_ok=True)
+        effective_cache_dir = self._effective_cache_dir
+        if effective_cache_dir:
+            # Set HuggingFace environment variables to use external storage
+            os.environ["HF_HOME"] = effective_cache_dir
+            os.environ["TRANSFORMERS_CACHE"] = effective_cache_dir
+            logger.info(f"Set cache environment variables to: {effective_cache_dir}")
+            
+            # Ensure the directory exists, skipping the mkdir when it already does
+            if not os.path.isdir(effective_cache_dir):
+                os.makedirs(effective_cache_dir, exist_ok=True)
+    
+    def _build_common_cache_dirs(self) -> Tuple[str, ...]:
+        """Get the directories that may hold plain model folders, prioritizing external storage"""
+        common_cache_dirs = []
+        
+        # If external storage is enabled, check it first
+        if self._effective_cache_dir:
+            common_cache_dirs.append(self._effective_cache_dir)
+        common_cache_dirs.extend(_STANDARD_CACHE_DIRS)
+        
+        # Filter out duplicates while maintaining priority order
+        return tuple(dict.fromkeys(common_cache_dirs))
     
-    def get_available_models(self) -> List[Dict[str, Any]]:
+    def get_available_models(self) -> List[Mapping[str, Any]]:
         """Get list of all available Whisper models"""
-        return self.AVAILABLE_MODELS.copy()
+        return list(self.AVAILABLE_MODELS)
         
     def is_model_available(self, model_name: str) -> bool:
         """Check if a model is available"""
-        return any(model["name"] == model_name for model in self.AVAILABLE_MODELS)
+        return model_name in self._MODEL_NAMES
     
-    def get_model_info(self, model_name: str) -> Dict[str, Any]:
+    def get_model_info(self, model_name: str) -> Optional[Mapping[str, Any]]:
         """Get information about a specific model"""
-        for model in self.AVAILABLE_MODELS:
-            if model["name"] == model_name:
-                return model.copy()
-        return None
+        return self._BY_NAME.get(model_name)
     
     def get_recommended_model(self, use_case: str = "balanced") -> str:
         """Get recommended model based on use case"""
@@ -123,137 +284,90 @@ class ModelsService:
         }
         return recommendations.get(use_case, "base")
     
-    def _get_model_cache_paths(self, model_name: str) -> List[Path]:
-        """Get possible cache paths for a model, prioritizing external storage when enabled"""
-        possible_paths = []
-        
+    def _iter_path_templates(self) -> Iterator[Tuple[str, str]]:
+        """Yield the model cache path templates, prioritizing external storage when enabled"""
         # If external storage is enabled, prioritize external paths
-        if config.ENABLE_EXTERNAL_STORAGE:
-            effective_cache_dir = config.get_effective_cache_dir()
-            if effective_cache_dir:
-                cache_base = Path(effective_cache_dir)
-                # Add external storage paths first (highest priority)
-                # Account for the .cache/huggingface subdirectory structure
-                possible_paths.extend([
-                    cache_base / ".cache" / "huggingface" / "hub" / f"models--guillaumekln--faster-whisper-{model_name}",
-                    cache_base / ".cache" / "huggingface" / "hub" / f"models--Systran--faster-whisper-{model_name}",
-                    cache_base / ".cache" / "huggingface" / "hub" / f"models--openai--whisper-{model_name}",
-                    cache_base / "hub" / f"models--guillaumekln--faster-whisper-{model_name}",
-                    cache_base / "hub" / f"models--Systran--faster-whisper-{model_name}",
-                    cache_base / "hub" / f"models--openai--whisper-{model_name}",
-                    cache_base / "transformers" / f"models--guillaumekln--faster-whisper-{model_name}",
-                    cache_base / "transformers" / f"models--Systran--faster-whisper-{model_name}",
-                    cache_base / "transformers" / f"models--openai--whisper-{model_name}",
-                    cache_base / model_name,
-                    cache_base / f"faster-whisper-{model_name}",
-                ])
+        if self._effective_cache_dir:
+            # Add external storage paths first (highest priority)
+            # Account for the .cache/huggingface subdirectory structure
+            yield from _expand_templates(
+                self._effective_cache_dir,
+                (os.path.join(".cache", "huggingface", "hub"), "hub", "transformers"),
+                _LOCAL_DIR_PATTERNS
+            )
         
         # Add standard HuggingFace cache paths as fallback
         hf_cache = os.environ.get("HF_HOME", os.path.expanduser("~/.cache/huggingface"))
-        hf_cache_base = Path(hf_cache)
+        yield from _expand_templates(hf_cache, ("hub", "transformers"), _LOCAL_DIR_PATTERNS)
         
-        # Only add these if they're not already added (avoid duplicates)
-        standard_paths = [
-            hf_cache_base / "hub" / f"models--guillaumekln--faster-whisper-{model_name}",
-            hf_cache_base / "hub" / f"models--Systran--faster-whisper-{model_name}",
-            hf_cache_base / "hub" / f"models--openai--whisper-{model_name}",
-            hf_cache_base / "transformers" / f"models--guillaumekln--faster-whisper-{model_name}",
-            hf_cache_base / "transformers" / f"models--Systran--faster-whisper-{model_name}",
-            hf_cache_base / "transformers" / f"models--openai--whisper-{model_name}",
-            hf_cache_base / model_name,
-            hf_cache_base / f"faster-whisper-{model_name}",
-        ]
-        
-        # Filter out duplicates while maintaining order
-        for path in standard_paths:
-            if path not in possible_paths:
-                possible_paths.append(path)
+        # Also check for a simple model directory with the model name
+        # in common cache locations, prioritizing external storage
+        for cache_dir in self._common_cache_dirs:
+            yield from _expand_templates(cache_dir, (), _PLAIN_DIR_PATTERNS)
+    
+    def _build_path_templates(self) -> Tuple[Tuple[str, str], ...]:
+        """Build the deduplicated model cache path templates in priority order"""
+        # The groups overlap (e.g. HF_HOME is usually ~/.cache/huggingface),
+        # so drop candidates that normalize to an already yielded path
+        unique_templates = []
+        seen = set()
+        for root, template in self._iter_path_templates():
+            key = os.path.normpath(template)
+            if key not in seen:
+                seen.add(key)
+                unique_templates.append((root, template))
         
-        return possible_paths
+        return tuple(unique_templates)
+    
+    def _get_model_cache_paths(self, model_name: str) -> Tuple[Tuple[str, str], ...]:
+        """Get (cache root, candidate path) pairs for a model, in priority order"""
+        return _expand_model_paths(model_name, self._path_templates)
     
     def is_model_downloaded(self, model_name: str) -> bool:
-        """Check if a model is downloaded locally without triggering downloads"""
+        """Check if a model is downloaded locally, using the cached result when still fresh"""
+        cached = self._downloaded_cache.get(model_name)
+        now = time.monotonic()
+        if cached is not None and now - cached[0] < self.CACHE_TTL:
+            return cached[1]
+        
+        downloaded = self._scan_model_downloaded(model_name)
+        self._downloaded_cache[model_name] = (now, downloaded)
+        return downloaded
+    
+    def invalidate_download_cache(self, model_name: Optional[str] = None):
+        """Forget cached download status for one model, or for all models if none is given"""
+        self._status_snapshot = None
+        if model_name is None:
+            self._downloaded_cache.clear()
+        else:
+            self._downloaded_cache.pop(model_name, None)
+    
+    def _get_live_roots(self) -> frozenset:
+        """Get the cache roots that exist, checking the filesystem only on first use"""
+        live_roots = self._live_roots
+        if live_roots is None:
+            roots = {root for root, _ in self._path_templates}
+            live_roots = frozenset(root for root in roots if os.path.isdir(root))
+            self._live_roots = live_roots
+        return live_roots
+    
+    def refresh_cache_roots(self):
+        """Re-check which cache roots exist on the next scan"""
+        self._live_roots = None
+    
+    def _scan_model_downloaded(self, model_name: str) -> bool:
+        """Scan the filesystem to check if a model is downloaded without triggering downloads"""
         try:
             # Only check file system paths - do NOT call any download functions
             # as they might trigger automatic downloads
             
-            # Check possible cache paths
-            for model_path in self._get_model_cache_paths(model_name):
-                if model_path.exists():
-                    # Look for model files, including in snapshots subdirectories
-                    model_files = (
-                        list(model_path.rglob("*.bin")) +
-                        list(model_path.rglob("*.safetensors")) +
-                        list(model_path.rglob("model.bin")) +
-                        list(model_path.rglob("pytorch_model.bin")) +
-                        list(model_path.rglob("*.ctranslate2"))  # CT2 format files
-                    )
-                    if len(model_files) > 0:
-                        logger.debug(f"Found model {model_name} at {model_path} with {len(model_files)} model files")
-                        return True
-                
-                # Also check for HuggingFace snapshots structure specifically
-                snapshots_path = model_path / "snapshots"
-                if snapshots_path.exists():
-                    # Look for any snapshot directory that contains model files
-                    for snapshot_dir in snapshots_path.iterdir():
-                        if snapshot_dir.is_dir():
-                            snapshot_files = (
-                                list(snapshot_dir.rglob("*.bin")) +
-                                list(snapshot_dir.rglob("*.safetensors")) +
-                                list(snapshot_dir.rglob("model.bin")) +
-                                list(snapshot_dir.rglob("pytorch_model.bin")) +
-                                list(snapshot_dir.rglob("*.ctranslate2"))
-                            )
-                            if len(snapshot_files) > 0:
-                                logger.debug(f"Found model {model_name} in snapshot at {snapshot_dir} with {len(snapshot_files)} model files")
-                                return True
-            
-            # Also check if there's a simple model directory with the model name
-            # in common cache locations, prioritizing external storage
-            common_cache_dirs = []
-            
-            # If external storage is enabled, check it first
-            if config.ENABLE_EXTERNAL_STORAGE:
-                effective_cache_dir = config.get_effective_cache_dir()
-                if effective_cache_dir and Path(effective_cache_dir).exists():
-                    common_cache_dirs.append(effective_cache_dir)
-            
-            # Add standard cache directories as fallback
-            standard_cache_dirs = [
-                os.path.expanduser("~/.cache/huggingface"),
-                os.path.expanduser("~/.cache/whisper"),
-                os.path.expanduser("~/.local/share/whisper"),
-                "/tmp/whisper",
-                "./models"  # Local models directory
-            ]
-            
-            # Filter out duplicates while maintaining priority order
-            for cache_dir in standard_cache_dirs:
-                if cache_dir not in common_cache_dirs:
-                    common_cache_dirs.append(cache_dir)
-            
-            for cache_dir in common_cache_dirs:
-                cache_path = Path(cache_dir)
-                if cache_path.exists():
-                    # Look for model directories
-                    possible_model_dirs = [
-                        cache_path / model_name,
-                        cache_path / f"whisper-{model_name}",
-                        cache_path / f"faster-whisper-{model_name}"
-                    ]
-                    
-                    for model_dir in possible_model_dirs:
-                        if model_dir.exists() and model_dir.is_dir():
-                            # Check if it has model files
-                            model_files = (
-                                list(model_dir.rglob("*.bin")) +
-                                list(model_dir.rglob("*.safetensors")) +
-                                list(model_dir.rglob("*.ctranslate2"))
-                            )
-                            if len(model_files) > 0:
-                                logger.debug(f"Found model {model_name} at {model_dir}")
-                                return True
+            # Check possible cache paths. Candidates below a cache root that
+            # does not exist are skipped without any syscall.
+            live_roots = self._get_live_roots()
+            for root, model_path in self._get_model_cache_paths(model_name):
+                if root in live_roots and _has_model_file(model_path):
+                    logger.debug(f"Found model {model_name} at {model_path}")
+                    return True
             
             return False
         except Exception as e:
@@ -262,14 +376,25 @@ class ModelsService:
     
     def get_downloaded_models(self) -> List[str]:
         """Get list of models that are downloaded locally"""
-        downloaded = []
-        for model in self.AVAILABLE_MODELS:
-            if self.is_model_downloaded(model["name"]):
-                downloaded.append(model["name"])
-        return downloaded
+        return [model["name"] for model in self.get_models_with_status() if model["downloaded"]]
+    
+    async def aget_downloaded_models(self) -> List[str]:
+        """Get list of models that are downloaded locally, checking all models concurrently"""
+        snapshot = self._get_fresh_snapshot()
+        if snapshot is not None:
+            return [model["name"] for model in snapshot[1] if model["downloaded"]]
+        
+        # Overlap the per-model filesystem scans in worker threads
+        names = list(self._BY_NAME)
+        results = await asyncio.gather(*(
+            asyncio.to_thread(self.is_model_downloaded, name) for name in names
+        ))
+        return [name for name, downloaded in zip(names, results) if downloaded]
     
     async def download_model(self, model_name: str, device: str = "cpu", compute_type: str = "int8") -> Dict[str, Any]:
         """Download a model if not already available"""
+        # device and compute_type are kept for API compatibility; they only
+        # matter when loading a model, not when fetching its files
         try:
             if not self.is_model_available(model_name):
                 return {
@@ -287,45 +412,44 @@ class ModelsService:
             
             logger.info(f"Starting download of model: {model_name}")
             
-            # Download the model by initializing it
-            # This will trigger the download if not already present
+            # Fetch the model files without loading them; building a WhisperModel
+            # here would pay the full CTranslate2 initialization just to download
             def _download_sync():
                 try:
-                    # Initialize the model which will download it if not present
-                    logger.info(f"Initializing WhisperModel for {model_name} with device={device}, compute_type={compute_type}")
-                    model = WhisperModel(model_name, device=device, compute_type=compute_type)
-                    logger.info(f"WhisperModel initialized successfully for {model_name}")
-                    # Clean up the model to free memory
-                    del model
-                    return True
+                    # Imported here since loading faster-whisper is expensive and
+                    # only needed when a download actually happens
+                    from faster_whisper.utils import download_model
+                    
+                    # Resolves the same HuggingFace repo WhisperModel would and
+                    # stores it in the hub cache (HF_HOME points at external
+                    # storage when enabled), resuming any partial download
+                    model_path = download_model(model_name)
+                    logger.info(f"Model files for {model_name} are in {model_path}")
+                    return model_path
                 except Exception as e:
                     logger.error(f"Error in _download_sync for {model_name}: {str(e)}")
                     raise e
             
             # Run the download in a thread to avoid blocking
             loop = asyncio.get_event_loop()
-            success = await loop.run_in_executor(None, _download_sync)
+            await loop.run_in_executor(None, _download_sync)
             
-            # Give it a moment for the files to be written
-            await asyncio.sleep(2)
+            # The cached status predates the download, force a fresh scan
+            # (the download may also have created a missing cache root)
+            self.refresh_cache_roots()
+            self.invalidate_download_cache(model_name)
             
-            # Verify download with more lenient checking after successful initialization
-            if self.is_model_downloaded(model_name):
-                logger.info(f"Successfully downloaded model: {model_name}")
-                return {
-                    "success": True,
-                    "message": f"Model '{model_name}' downloaded successfully",
-                    "downloaded": True
-                }
-            else:
-                # If our file-based detection fails, but the model initialized successfully,
-                # we can assume the download worked (the model is cached somewhere)
-                logger.info(f"Model {model_name} initialized successfully but file verification failed - assuming download succeeded")
-                return {
-                    "success": True,
-                    "message": f"Model '{model_name}' downloaded successfully (cached by faster-whisper)",
-                    "downloaded": True
-                }
+            # run_in_executor only returns once the files are fetched, so they
+            # are already in place; detection is only re-checked for debugging
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Model {model_name} detected on disk after download: {self.is_model_downloaded(model_name)}")
+            
+            logger.info(f"Successfully downloaded model: {model_name}")
+            return {
+                "success": True,
+                "message": f"Model '{model_name}' downloaded successfully",
+                "downloaded": True
+            }
                 
         except Exception as e:
             logger.error(f"Error downloading model {model_name}: {str(e)}")
@@ -339,12 +463,47 @@ class ModelsService:
     
     def get_models_with_status(self) -> List[Dict[str, Any]]:
         """Get all models with their download status"""
-        models_with_status = []
-        for model in self.AVAILABLE_MODELS:
-            model_info = model.copy()
-            model_info["downloaded"] = self.is_model_downloaded(model["name"])
-            models_with_status.append(model_info)
-        return models_with_status
+        # The snapshot is shared until it expires, so callers get their own dicts
+        return [dict(model) for model in self.get_models_status_snapshot()[0]]
+    
+    def _get_fresh_snapshot(self) -> Optional[Tuple[float, List[Dict[str, Any]], str]]:
+        """Get the status snapshot if it is younger than CACHE_TTL"""
+        snapshot = self._status_snapshot
+        if snapshot is not None and time.monotonic() - snapshot[0] < self.CACHE_TTL:
+            return snapshot
+        return None
+    
+    def refresh_models_status(self) -> Tuple[List[Dict[str, Any]], str]:
+        """Rescan every model and rebuild the status snapshot"""
+        self.refresh_cache_roots()
+        self.invalidate_download_cache()
+        return self.get_models_status_snapshot()
+    
+    def get_models_status_snapshot(self) -> Tuple[List[Dict[str, Any]], str]:
+        """Get all models with their download status and an ETag, rebuilt at most once per CACHE_TTL; the list is shared and must not be modified"""
+        snapshot = self._get_fresh_snapshot()
+        if snapshot is not None:
+            return snapshot[1], snapshot[2]
+        
+        now = time.monotonic()
+        # The per-model filesystem scans are independent and I/O bound, so
+        # overlap them in worker threads
+        with ThreadPoolExecutor(max_workers=len(self.AVAILABLE_MODELS)) as executor:
+            downloaded = list(executor.map(self.is_model_downloaded, self._BY_NAME))
+        
+        # The entries are read-only proxies, so each listed model is a single
+        # new dict built from the entry plus its status
+        models_with_status = [
+            {**model, "downloaded": is_downloaded}
+            for model, is_downloaded in zip(self.AVAILABLE_MODELS, downloaded)
+        ]
+        
+        etag = hashlib.blake2b(
+            json.dumps(models_with_status, sort_keys=True).encode(),
+            digest_size=8
+        ).hexdigest()
+        self._status_snapshot = (now, models_with_status, etag)
+        return models_with_status, etag
 
 # Global instance - will be initialized with actual current model in main.py
 models_service = None
\ No newline at end of file
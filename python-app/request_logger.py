@@ -5,16 +5,25 @@ import json
 import time
 from datetime import datetime
 from typing import List, Dict, Any, Optional
-from dataclasses import dataclass, asdict
-from collections import deque
+from dataclasses import dataclass
+from collections import Counter, OrderedDict, deque
 import logging
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Header names (lowercase) whose values are never written to the log
+_SENSITIVE_HEADERS = frozenset({
+    'authorization', 'cookie', 'x-api-key', 'x-auth-token',
+    'x-access-token', 'x-csrf-token', 'x-session-id'
+})
+
+# Bodies longer than this many characters are truncated before being stored
+_MAX_BODY_LENGTH = 10000
+
+@dataclass(slots=True)
 class RequestLog:
     """Data class for storing request/response information"""
-    timestamp: str
+    timestamp_ns: int
     method: str
     path: str
     query_params: Dict[str, Any]
@@ -27,6 +36,16 @@ class RequestLog:
     client_ip: str
     user_agent: str
     request_id: str
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the entry to a dictionary without deep-copying every field"""
+        entry = {field: getattr(self, field) for field in self.__slots__}
+        # The ISO timestamp is only formatted for entries that are actually read
+        entry = {"timestamp": datetime.fromtimestamp(entry.pop("timestamp_ns") / 1e9).isoformat(), **entry}
+        # Copy the header/query dicts so callers can't mutate the stored entry
+        for field in ("query_params", "headers", "response_headers"):
+            entry[field] = dict(entry[field])
+        return entry
 
 class RequestLogger:
     """Service for logging and retrieving API requests/responses"""
@@ -35,6 +54,7 @@ class RequestLogger:
         """Initialize the request logger with a maximum number of logs to keep"""
         self.max_logs = max_logs
         self.logs: deque = deque(maxlen=max_logs)
+        self._by_id: "OrderedDict[str, RequestLog]" = OrderedDict()
         self._request_counter = 0
     
     def log_request(self, 
@@ -52,18 +72,25 @@ class RequestLogger:
         """Log a request/response pair"""
         
         self._request_counter += 1
-        request_id = f"req_{self._request_counter}_{int(time.time())}"
+        timestamp_ns = time.time_ns()
+        request_id = f"req_{self._request_counter}_{timestamp_ns // 1_000_000_000}"
         
         # Filter sensitive headers
         filtered_headers = self._filter_sensitive_headers(headers)
         filtered_response_headers = self._filter_sensitive_headers(response_headers)
         
-        # Truncate large bodies
-        truncated_request_body = self._truncate_body(request_body)
-        truncated_response_body = self._truncate_body(response_body)
+        # Truncate large bodies; most bodies are short, so check before calling out
+        truncated_request_body = (
+            request_body if request_body is None or len(request_body) <= _MAX_BODY_LENGTH
+            else self._truncate_body(request_body)
+        )
+        truncated_response_body = (
+            response_body if response_body is None or len(response_body) <= _MAX_BODY_LENGTH
+            else self._truncate_body(response_body)
+        )
         
         log_entry = RequestLog(
-            timestamp=datetime.now().isoformat(),
+            timestamp_ns=timestamp_ns,
             method=method,
             path=path,
             query_params=query_params,
@@ -79,6 +106,10 @@ class RequestLogger:
         )
         
         self.logs.append(log_entry)
+        # Keep the id index in step with the deque, which drops the oldest entry
+        self._by_id[request_id] = log_entry
+        if len(self._by_id) > self.max_logs:
+            self._by_id.popitem(last=False)
         logger.debug(f"Logged request {request_id}: {method} {path} -> {response_status}")
         
         return request_id
@@ -87,110 +118,77 @@ class RequestLogger:
                  method_filter: Optional[str] = None,
                  path_filter: Optional[str] = None,
                  status_filter: Optional[int] = None) -> List[Dict[str, Any]]:
-        """Get logged requests with optional filtering"""
-        
-        logs = list(self.logs)
-        
-        # Apply filters
-        if method_filter:
-            logs = [log for log in logs if log.method.upper() == method_filter.upper()]
-        
-        if path_filter:
-            logs = [log for log in logs if path_filter in log.path]
-        
-        if status_filter:
-            logs = [log for log in logs if log.response_status == status_filter]
-        
-        # Sort by timestamp (newest first)
-        logs.sort(key=lambda x: x.timestamp, reverse=True)
-        
-        # Apply limit
-        if limit:
-            logs = logs[:limit]
-        
-        # Convert to dictionaries
-        return [asdict(log) for log in logs]
+        """Get logged requests with optional filtering, newest first"""
+        
+        method_filter = method_filter.upper() if method_filter else None
+        matches = []
+        
+        # Logs are appended chronologically, so walking backwards yields newest
+        # first and lets us stop as soon as the limit is reached
+        for log in reversed(self.logs):
+            # Apply filters
+            if method_filter and log.method.upper() != method_filter:
+                continue
+            if path_filter and path_filter not in log.path:
+                continue
+            if status_filter and log.response_status != status_filter:
+                continue
+            
+            matches.append(log.to_dict())
+            if limit and len(matches) >= limit:
+                break
+        
+        return matches
     
     def get_log_by_id(self, request_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific log entry by request ID"""
-        for log in self.logs:
-            if log.request_id == request_id:
-                return asdict(log)
-        return None
+        log = self._by_id.get(request_id)
+        return None if log is None else log.to_dict()
     
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics about logged requests"""
-        if not self.logs:
-            return {
-                "total_requests": 0,
-                "avg_processing_time_ms": 0,
-                "status_codes": {},
-                "methods": {},
-                "paths": {}
-            }
-        
-        logs = list(self.logs)
-        total_requests = len(logs)
+        status_codes = Counter()
+        methods = Counter()
+        paths = Counter()
+        total_processing_time = 0.0
         
-        # Calculate average processing time
-        avg_processing_time = sum(log.processing_time_ms for log in logs) / total_requests
-        
-        # Count status codes
-        status_codes = {}
-        for log in logs:
-            status_codes[log.response_status] = status_codes.get(log.response_status, 0) + 1
-        
-        # Count methods
-        methods = {}
-        for log in logs:
-            methods[log.method] = methods.get(log.method, 0) + 1
+        # Aggregate everything in a single pass over the logs
+        for log in self.logs:
+            status_codes[log.response_status] += 1
+            methods[log.method] += 1
+            paths[log.path] += 1
+            total_processing_time += log.processing_time_ms
         
-        # Count paths
-        paths = {}
-        for log in logs:
-            paths[log.path] = paths.get(log.path, 0) + 1
+        total_requests = len(self.logs)
+        avg_processing_time = total_processing_time / total_requests if total_requests else 0
         
         return {
             "total_requests": total_requests,
-            "avg_processing_time_ms": round(avg_processing_time, 2),
-            "status_codes": status_codes,
-            "methods": methods,
-            "paths": dict(sorted(paths.items(), key=lambda x: x[1], reverse=True)[:10])  # Top 10 paths
+            "avg_processing_time_ms": avg_processing_time,
+            "status_codes": dict(status_codes),
+            "methods": dict(methods),
+            "paths": dict(paths.most_common(10))  # Top 10 paths
         }
     
     def clear_logs(self) -> int:
         """Clear all logs and return the number of logs that were cleared"""
         count = len(self.logs)
         self.logs.clear()
+        self._by_id.clear()
         self._request_counter = 0
         logger.info(f"Cleared {count} request logs")
         return count
     
     def _filter_sensitive_headers(self, headers: Dict[str, str]) -> Dict[str, str]:
         """Filter out sensitive headers from logging"""
-        sensitive_headers = {
-            'authorization', 'cookie', 'x-api-key', 'x-auth-token', 
-            'x-access-token', 'x-csrf-token', 'x-session-id'
+        return {
+            key: "[REDACTED]" if key.lower() in _SENSITIVE_HEADERS else value
+            for key, value in headers.items()
         }
-        
-        filtered = {}
-        for key, value in headers.items():
-            if key.lower() in sensitive_headers:
-                filtered[key] = "[REDACTED]"
-            else:
-                filtered[key] = value
-        
-        return filtered
     
-    def _truncate_body(self, body: Optional[str], max_length: int = 10000) -> Optional[str]:
-        """Truncate request/response bodies if they're too long"""
-        if body is None:
-            return None
-        
-        if len(body) <= max_length:
-            return body
-        
-        return body[:max_length] + f"... [TRUNCATED - Original length: {len(body)} chars]"
+    def _truncate_body(self, body: str) -> str:
+        """Truncate a request/response body that is longer than _MAX_BODY_LENGTH"""
+        return body[:_MAX_BODY_LENGTH] + f"... [TRUNCATED - Original length: {len(body)} chars]"
 
 # Global instance
 request_logger = RequestLogger()
\ No newline at end of file
@@ -3,32 +3,29 @@
 Convenience script to run the WhisperX Assistant API
 """
 import argparse
+import importlib.util
 import os
+import shutil
 import sys
 import subprocess
 from pathlib import Path
 
 def check_ffmpeg():
     """Check if FFmpeg is installed"""
-    try:
-        subprocess.run(['ffmpeg', '-version'], 
-                      stdout=subprocess.DEVNULL, 
-                      stderr=subprocess.DEVNULL, 
-                      check=True)
-        return True
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        return False
+    # Looking the binary up on PATH avoids spawning ffmpeg just to probe for it
+    return shutil.which('ffmpeg') is not None
 
 def check_dependencies():
     """Check if required dependencies are installed"""
-    try:
-        import fastapi
-        import uvicorn
-        import faster_whisper
-        return True
-    except ImportError as e:
-        print(f"Missing dependency: {e}")
-        return False
+    # Locate the packages without importing them; importing faster_whisper
+    # alone takes hundreds of milliseconds. Caches are invalidated so packages
+    # installed earlier in this run (--install-deps) are found.
+    importlib.invalidate_caches()
+    for module in ('fastapi', 'uvicorn', 'faster_whisper'):
+        if importlib.util.find_spec(module) is None:
+            print(f"Missing dependency: No module named '{module}'")
+            return False
+    return True
 
 def install_dependencies():
     """Install required dependencies"""
@@ -49,7 +46,7 @@ def install_dependencies():
             print("Binary-only installation failed, trying individual packages...")
             try:
                 # Install packages individually
-                packages = ['fastapi==0.104.1', 'uvicorn[standard]==0.24.0', 'python-multipart==0.0.6', 'jinja2==3.1.2']
+                packages = ['fastapi==0.104.1', 'uvicorn[standard]==0.24.0', 'python-multipart==0.0.6', 'jinja2==3.1.2', 'orjson==3.9.10']
                 for package in packages:
                     subprocess.run([sys.executable, '-m', 'pip', 'install', package], check=True)
                 
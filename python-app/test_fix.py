@@ -1,44 +1,30 @@
-#!/usr/bin/env python3
 """
-Simple test script to verify the model_name parameter fix
+Simple tests to verify the model_name parameter fix
+
+Run with: python -m pytest test_fix.py
 """
+import pytest
+
+def transcribe_audio(audio_content: bytes, language: str = None, model_name: str = None):
+    """Mock transcription method with the new signature"""
+    return {
+        "audio_size": len(audio_content),
+        "language": language or "en",
+        "model_name": model_name or "base",
+        "text": "Mock transcription result"
+    }
 
-def test_method_signature():
+@pytest.mark.parametrize("args,kwargs,expected_language,expected_model", [
+    ((b"fake audio", "fr", "large"), {}, "fr", "large"),  # All parameters
+    ((b"fake audio",), {}, "en", "base"),  # Defaults
+    ((b"fake audio", "es"), {}, "es", "base"),  # Only language
+    ((b"fake audio",), {"model_name": "medium"}, "en", "medium"),  # Only model_name
+])
+def test_method_signature(args, kwargs, expected_language, expected_model):
     """Test that the method signature accepts model_name parameter"""
-    
-    # Mock the transcription service method signature
-    def transcribe_audio(audio_content: bytes, language: str = None, model_name: str = None):
-        """Mock transcription method with the new signature"""
-        return {
-            "audio_size": len(audio_content),
-            "language": language or "en",
-            "model_name": model_name or "base",
-            "text": "Mock transcription result"
-        }
-    
-    # Test 1: Call with all parameters
-    result1 = transcribe_audio(b"fake audio", "fr", "large")
-    assert result1["language"] == "fr"
-    assert result1["model_name"] == "large"
-    print("PASS: Test 1 passed: All parameters work correctly")
-    
-    # Test 2: Call with defaults
-    result2 = transcribe_audio(b"fake audio")
-    assert result2["language"] == "en"
-    assert result2["model_name"] == "base"
-    print("PASS: Test 2 passed: Default parameters work correctly")
-    
-    # Test 3: Call with only language
-    result3 = transcribe_audio(b"fake audio", "es")
-    assert result3["language"] == "es"
-    assert result3["model_name"] == "base"
-    print("PASS: Test 3 passed: Language parameter works correctly")
-    
-    # Test 4: Call with only model_name
-    result4 = transcribe_audio(b"fake audio", model_name="medium")
-    assert result4["language"] == "en"
-    assert result4["model_name"] == "medium"
-    print("PASS: Test 4 passed: Model name parameter works correctly")
+    result = transcribe_audio(*args, **kwargs)
+    assert result["language"] == expected_language
+    assert result["model_name"] == expected_model
 
 def test_api_call_simulation():
     """Simulate the API call flow"""
@@ -66,18 +52,3 @@ def test_api_call_simulation():
     assert "large" in result["text"]
     assert result["model_used"] == "large"
     print("PASS: API simulation passed: model_name is properly passed through")
-
-if __name__ == "__main__":
-    print("Testing the model_name parameter fix...\n")
-    
-    test_method_signature()
-    print()
-    test_api_call_simulation()
-    
-    print("\nAll tests passed! The model_name parameter fix is working correctly.")
-    print("\nSummary of changes made:")
-    print("1. Updated transcription_service.transcribe_audio() to accept model_name parameter")
-    print("2. Added logic to switch models when model_name differs from current model")
-    print("3. Updated main.py to pass model_name to transcription service")
-    print("4. Added comprehensive tests for the new functionality")
-    print("\nThe issue has been resolved: model_name parameter is now properly passed to transcription_service.transcribe_audio()")
\ No newline at end of file
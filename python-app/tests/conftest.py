@@ -0,0 +1,74 @@
+import functools
+import io
+import pytest
+import httpx
+from unittest.mock import patch, MagicMock
+from fastapi.staticfiles import StaticFiles
+
+# Imported before pytest_configure patches it, so this is the real class
+from faster_whisper import WhisperModel
+from models_service import model_pool
+
+
+def pytest_configure(config):
+    """Stub WhisperModel and import the app before any test module is collected"""
+    # Any test reaching get_transcription_service() loads the default model,
+    # so the stub is in place for the whole session rather than per fixture
+    whisper_model_patcher = patch("faster_whisper.WhisperModel")
+    whisper_model_patcher.start()
+    config.add_cleanup(whisper_model_patcher.stop)
+    
+    # The app mounts images/ from the working directory, which only the Docker
+    # image places next to main.py; no test fetches an image, so the mount is
+    # created without checking for the directory
+    static_files_patcher = patch("fastapi.staticfiles.StaticFiles", functools.partial(StaticFiles, check_dir=False))
+    static_files_patcher.start()
+    config.add_cleanup(static_files_patcher.stop)
+    
+    # Warm up the app import (FastAPI, pydantic) once per
+    # process that runs tests; an xdist controller only distributes them
+    if getattr(config.option, "numprocesses", None) and not hasattr(config, "workerinput"):
+        return
+    import main
+
+
+@pytest.fixture(autouse=True)
+def clear_model_pool():
+    """Start every test with an empty model pool so WhisperModel patches take effect"""
+    model_pool.clear()
+    yield
+    model_pool.clear()
+
+
+@pytest.fixture
+def whisper_model(monkeypatch):
+    """Replace WhisperModel in the transcription service; the loaded model is its return_value"""
+    mock_whisper_model = MagicMock()
+    # Only the real model's attributes exist on the loaded model, so a typo
+    # or renamed method fails instead of returning another mock
+    mock_whisper_model.return_value = MagicMock(spec=WhisperModel)
+    # The service imports faster-whisper lazily, so the patch goes on the package
+    monkeypatch.setattr("faster_whisper.WhisperModel", mock_whisper_model)
+    # Transcribe through the mocked model itself, whichever faster-whisper
+    # version is installed
+    monkeypatch.setattr("faster_whisper.BatchedInferencePipeline", None, raising=False)
+    return mock_whisper_model
+
+
+@pytest.fixture
+def audio_upload():
+    """Build the multipart files payload for an audio upload"""
+    def make_upload(content: bytes = b"fake audio content"):
+        return {"file": ("test.wav", io.BytesIO(content), "audio/wav")}
+    return make_upload
+
+
+@pytest.fixture
+async def aclient():
+    """Call the app in-process through httpx's ASGI transport"""
+    # Normally already imported by pytest_configure, so this is a cache hit
+    from main import app
+    # Unlike TestClient there is no thread portal between the test and the
+    # async endpoints; startup/shutdown events are not run
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver") as client:
+        yield client
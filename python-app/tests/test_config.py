@@ -0,0 +1,33 @@
+import ast
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+def read_config(attribute, **env):
+    """Read a Config attribute in a fresh interpreter, since settings are read from the environment at import"""
+    environ = {key: value for key, value in os.environ.items() if key not in ("WHISPER_CPU_THREADS", "WHISPER_TEMPERATURE")}
+    environ.update(env)
+    result = subprocess.run(
+        [sys.executable, "-c", f"from config import config; print(repr(config.{attribute}))"],
+        cwd=Path(__file__).resolve().parent.parent,
+        env=environ,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return ast.literal_eval(result.stdout.strip())
+
+class TestConfig:
+    """Test cases for the environment-driven Config"""
+    
+    def test_cpu_threads_defaults_to_library_default(self):
+        """Test that the CPU thread count is left to faster-whisper unless configured"""
+        assert read_config("WHISPER_CPU_THREADS") == 0
+        assert read_config("WHISPER_CPU_THREADS", WHISPER_CPU_THREADS="2") == 2
+    
+    def test_temperature_keeps_fallback_schedule(self):
+        """Test that the temperature fallback is on by default and configurable as a list"""
+        assert read_config("WHISPER_TEMPERATURE") == (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+        assert read_config("WHISPER_TEMPERATURE", WHISPER_TEMPERATURE="0.0, 0.5") == (0.0, 0.5)
+        assert read_config("WHISPER_TEMPERATURE", WHISPER_TEMPERATURE="0") == (0.0,)
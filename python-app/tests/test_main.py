@@ -1,67 +1,82 @@
+import asyncio
+import os
+import numpy as np
 import pytest
-from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
-import io
+from unittest.mock import patch, ANY, MagicMock
 
-from main import app
+# The endpoints are called in-process through httpx's ASGI transport
+pytestmark = pytest.mark.asyncio
 
-client = TestClient(app)
+# Transcription result returned by the mocked service; shared by reference
+# since the endpoint only serializes it
+MOCK_SUCCESS = {
+    "text": "Hello world",
+    "segments": [
+        {
+            "id": 0,
+            "seek": 0,
+            "start": 0.0,
+            "end": 2.0,
+            "text": "Hello world",
+            "tokens": [],
+            "temperature": 0.0,
+        }
+    ],
+    "language": "en"
+}
 
 class TestAPI:
     """Test cases for the main API endpoints"""
     
-    def test_root_endpoint_dashboard(self):
+    async def test_root_endpoint_dashboard(self, aclient):
         """Test the root endpoint serves HTML dashboard"""
-        response = client.get("/")
+        response = await aclient.get("/")
         assert response.status_code == 200
         assert "text/html" in response.headers["content-type"]
         assert "WhisperX Assistant API" in response.text
-        assert "Available Models" in response.text
+        assert "AI Model Repository" in response.text
+        assert 'data-model-name="base"' in response.text
     
-    def test_api_info_endpoint(self):
+    async def test_api_info_endpoint(self, aclient):
         """Test the API info endpoint returns JSON"""
-        response = client.get("/api/info")
+        response = await aclient.get("/api/info")
         assert response.status_code == 200
         data = response.json()
         assert "message" in data
         assert "version" in data
         assert "status" in data
-        assert "current_model" in data
+        assert "device" in data
         assert "available_models" in data
     
-    def test_health_check(self):
+    async def test_health_check(self, aclient):
         """Test the health check endpoint"""
-        response = client.get("/v1/health")
+        response = await aclient.get("/v1/health")
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == "ok"
-        assert "model" in data
+        assert "storage" in data
         assert "device" in data
         assert "version" in data
         assert "available_models" in data
         assert isinstance(data["available_models"], list)
     
-    def test_models_endpoint(self):
+    async def test_models_endpoint(self, aclient):
         """Test the models endpoint"""
-        response = client.get("/v1/models")
+        response = await aclient.get("/v1/models")
         assert response.status_code == 200
         data = response.json()
-        assert "current_model" in data
         assert "available_models" in data
-        assert "current_model_info" in data
+        assert "downloaded_models" in data
         assert isinstance(data["available_models"], list)
         assert len(data["available_models"]) > 0
         
-        # Check model structure
-        for model in data["available_models"]:
-            assert "name" in model
-            assert "size" in model
-            assert "description" in model
-            assert "downloaded" in model
+        # Check model structure; lists any models missing a required field
+        required = {"name", "size", "description", "downloaded"}
+        assert [model for model in data["available_models"] if not required <= model.keys()] == []
     
-    def test_downloaded_models_endpoint(self):
+    async def test_downloaded_models_endpoint(self, aclient):
         """Test the downloaded models endpoint"""
-        response = client.get("/v1/models/downloaded")
+        response = await aclient.get("/v1/models/downloaded")
         assert response.status_code == 200
         data = response.json()
         assert "downloaded_models" in data
@@ -69,8 +84,8 @@ class TestAPI:
         assert isinstance(data["downloaded_models"], list)
         assert isinstance(data["total_available"], int)
     
-    @patch('models_service.models_service.download_model')
-    def test_download_model_success(self, mock_download):
+    @patch('main.models_service.download_model')
+    async def test_download_model_success(self, mock_download, aclient):
         """Test successful model download"""
         mock_download.return_value = {
             "success": True,
@@ -78,7 +93,7 @@ class TestAPI:
             "downloaded": True
         }
         
-        response = client.post("/v1/models/base/download")
+        response = await aclient.post("/v1/models/base/download")
         assert response.status_code == 200
         data = response.json()
         assert data["success"] == True
@@ -87,8 +102,8 @@ class TestAPI:
         
         mock_download.assert_called_once()
     
-    @patch('models_service.models_service.download_model')
-    def test_download_model_failure(self, mock_download):
+    @patch('main.models_service.download_model')
+    async def test_download_model_failure(self, mock_download, aclient):
         """Test failed model download"""
         mock_download.return_value = {
             "success": False,
@@ -96,111 +111,254 @@ class TestAPI:
             "downloaded": False
         }
         
-        response = client.post("/v1/models/nonexistent/download")
+        response = await aclient.post("/v1/models/nonexistent/download")
         assert response.status_code == 400
+        assert response.json()["detail"] == "Download failed"
         
         mock_download.assert_called_once()
     
-    @patch('transcription_service.transcription_service.transcribe_audio')
-    def test_transcribe_audio_success(self, mock_transcribe):
-        """Test successful audio transcription"""
-        # Mock the transcription service response
-        mock_transcribe.return_value = {
-            "text": "Hello world",
-            "segments": [
-                {
-                    "id": 0,
-                    "seek": 0,
-                    "start": 0.0,
-                    "end": 2.0,
-                    "text": "Hello world",
-                    "tokens": [],
-                    "temperature": 0.0,
-                }
-            ],
-            "language": "en"
-        }
+    @pytest.mark.parametrize("form_data,mock_result,expected_language,expected_model", [
+        ({}, MOCK_SUCCESS, "en", "base"),
+        ({"language": "fr"}, {"text": "Bonjour le monde", "segments": [], "language": "fr"}, "fr", "base"),
+        ({"model": "large", "language": "en"}, {"text": "Hello from large model", "segments": [], "language": "en"}, "en", "large"),
+    ], ids=["defaults", "with_language", "with_model"])
+    @patch('transcription_service.TranscriptionService.transcribe_path')
+    async def test_transcribe_audio_success(self, mock_transcribe, aclient, audio_upload,
+                                      form_data, mock_result, expected_language, expected_model):
+        """Test successful audio transcription with default and explicit language/model"""
+        mock_transcribe.return_value = mock_result
         
-        # Create a mock audio file
-        audio_content = b"fake audio content"
-        files = {"file": ("test.wav", io.BytesIO(audio_content), "audio/wav")}
+        response = await aclient.post("/v1/audio/transcriptions", files=audio_upload(), data=form_data)
         
-        response = client.post("/v1/audio/transcriptions", files=files)
+        assert response.status_code == 200
+        result = response.json()
+        assert result["text"] == mock_result["text"]
+        assert result["language"] == expected_language
+        assert len(result["segments"]) == len(mock_result["segments"])
+        
+        # Verify the service was called with (audio_path, language, model)
+        mock_transcribe.assert_called_once_with(ANY, expected_language, expected_model, segment_layout="objects")
+    
+    @patch('fastapi.routing.jsonable_encoder')
+    @patch('transcription_service.TranscriptionService.transcribe_path')
+    async def test_transcribe_audio_skips_jsonable_encoder(self, mock_transcribe, mock_encoder, aclient, audio_upload):
+        """Test that the transcription result is serialized without the jsonable_encoder walk"""
+        mock_transcribe.return_value = MOCK_SUCCESS
+        
+        response = await aclient.post("/v1/audio/transcriptions", files=audio_upload())
         
         assert response.status_code == 200
-        data = response.json()
-        assert data["text"] == "Hello world"
-        assert data["language"] == "en"
-        assert len(data["segments"]) == 1
+        assert response.json() == MOCK_SUCCESS
+        mock_encoder.assert_not_called()
+    
+    @patch('transcription_service.TranscriptionService.transcribe_path')
+    async def test_transcribe_audio_invalid_segment_layout(self, mock_transcribe, aclient, audio_upload):
+        """Test that an unknown segment layout is rejected before transcribing"""
+        response = await aclient.post("/v1/audio/transcriptions", files=audio_upload(), data={"segment_layout": "rows"})
         
-        # Verify the service was called
-        mock_transcribe.assert_called_once()
+        assert response.status_code == 400
+        assert "segment_layout" in response.json()["detail"]
+        mock_transcribe.assert_not_called()
     
-    def test_transcribe_audio_empty_file(self):
-        """Test transcription with empty file"""
-        files = {"file": ("test.wav", io.BytesIO(b""), "audio/wav")}
+    @pytest.mark.skipif(not hasattr(os, "memfd_create"), reason="memfd_create is Linux-only")
+    @patch('transcription_service.TranscriptionService.transcribe_path')
+    async def test_transcribe_audio_spools_to_memfd(self, mock_transcribe, aclient, audio_upload):
+        """Test that the upload is handed over as an anonymous in-memory file"""
+        seen = {}
+        
+        async def transcribe_path(audio_path, *args, **kwargs):
+            seen["path"] = audio_path
+            seen["target"] = os.readlink(audio_path)
+            with open(audio_path, "rb") as f:
+                seen["content"] = f.read()
+            return MOCK_SUCCESS
+        
+        mock_transcribe.side_effect = transcribe_path
+        
+        response = await aclient.post("/v1/audio/transcriptions", files=audio_upload(b"spooled audio"))
+        
+        assert response.status_code == 200
+        assert seen["path"].startswith("/proc/self/fd/")
+        assert seen["target"].startswith("/memfd:whisper-upload")
+        assert seen["content"] == b"spooled audio"
+    
+    @patch('transcription_service.TranscriptionService.decode_path')
+    @patch('transcription_service.TranscriptionService.transcribe_stream')
+    async def test_transcribe_audio_stream(self, mock_stream, mock_decode, aclient, audio_upload):
+        """Test that stream=true relays transcription events as server-sent events"""
+        mock_decode.return_value = np.zeros(16000, dtype=np.float32)
+        
+        async def transcribe_stream(audio, language, model):
+            yield {"type": "transcript.text.delta", "delta": "Hello"}
+            yield {"type": "transcript.text.done", "text": "Hello", "language": language}
+        
+        mock_stream.side_effect = transcribe_stream
+        
+        response = await aclient.post("/v1/audio/transcriptions", files=audio_upload(), data={"stream": "true"})
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.text == (
+            'data: {"type":"transcript.text.delta","delta":"Hello"}\n\n'
+            'data: {"type":"transcript.text.done","text":"Hello","language":"en"}\n\n'
+        )
+    
+    @patch('transcription_service.TranscriptionService.decode_path')
+    @patch('transcription_service.TranscriptionService.transcribe_stream')
+    async def test_transcribe_audio_stream_error(self, mock_stream, mock_decode, aclient, audio_upload):
+        """Test that a failure after the stream started is reported as an error event"""
+        mock_decode.return_value = np.zeros(16000, dtype=np.float32)
+        
+        async def transcribe_stream(audio, language, model):
+            raise RuntimeError("decoder crashed")
+            yield
+        
+        mock_stream.side_effect = transcribe_stream
+        
+        response = await aclient.post("/v1/audio/transcriptions", files=audio_upload(), data={"stream": "true"})
+        
+        assert response.status_code == 200
+        assert '"type":"error"' in response.text
+        assert "decoder crashed" in response.text
+    
+    @patch('main._HAS_MEMFD', False)
+    @patch('transcription_service.TranscriptionService.decode_path')
+    @patch('transcription_service.TranscriptionService.transcribe_stream')
+    async def test_transcribe_audio_stream_closed_early(self, mock_stream, mock_decode, aclient, audio_upload, monkeypatch):
+        """Test that a stream the client drops still frees the upload and the queue slot"""
+        audio = np.zeros(16000, dtype=np.float32)
+        seen = {}
+        
+        async def decode_path(audio_path):
+            seen["path"] = audio_path
+            # Decoding counts against the admission limit too
+            seen["decoded_in_slot"] = transcribe_sem.locked()
+            return audio
+        
+        async def transcribe_stream(audio, language, model):
+            seen["audio"] = audio
+            yield {"type": "transcript.text.delta", "delta": "Hello"}
+            yield {"type": "transcript.text.delta", "delta": "world"}
+        
+        mock_decode.side_effect = decode_path
+        mock_stream.side_effect = transcribe_stream
+        transcribe_sem = asyncio.Semaphore(1)
+        monkeypatch.setattr("main._TRANSCRIBE_SLOTS", transcribe_sem)
+        
+        async with aclient.stream("POST", "/v1/audio/transcriptions", files=audio_upload(), data={"stream": "true"}) as response:
+            assert response.status_code == 200
+            # The upload is decoded and removed before the first event goes out
+            assert not os.path.exists(seen["path"])
+            async for _ in response.aiter_bytes():
+                break
         
-        response = client.post("/v1/audio/transcriptions", files=files)
+        assert seen["audio"] is audio
+        assert seen["decoded_in_slot"] == True
+        assert not transcribe_sem.locked()
+    
+    @patch('transcription_service.TranscriptionService.transcribe_stream')
+    async def test_transcribe_audio_stream_rejects_column_layout(self, mock_stream, aclient, audio_upload):
+        """Test that stream=true refuses a segment layout it cannot apply"""
+        response = await aclient.post(
+            "/v1/audio/transcriptions",
+            files=audio_upload(),
+            data={"stream": "true", "segment_layout": "columns"}
+        )
         
         assert response.status_code == 400
-        assert "Empty file provided" in response.json()["detail"]
+        assert "segment_layout" in response.json()["detail"]
+        mock_stream.assert_not_called()
     
-    @patch('transcription_service.transcription_service.transcribe_audio')
-    def test_transcribe_audio_service_error(self, mock_transcribe):
-        """Test transcription when service raises an error"""
-        mock_transcribe.side_effect = Exception("Transcription failed")
+    @patch('main._HAS_MEMFD', False)
+    @patch('transcription_service.TranscriptionService.transcribe_path')
+    async def test_transcribe_audio_spools_to_temp_file(self, mock_transcribe, aclient, audio_upload):
+        """Test the temp file fallback for platforms without memfd_create"""
+        seen = {}
         
-        audio_content = b"fake audio content"
-        files = {"file": ("test.wav", io.BytesIO(audio_content), "audio/wav")}
+        async def transcribe_path(audio_path, *args, **kwargs):
+            seen["path"] = audio_path
+            with open(audio_path, "rb") as f:
+                seen["content"] = f.read()
+            return MOCK_SUCCESS
         
-        response = client.post("/v1/audio/transcriptions", files=files)
+        mock_transcribe.side_effect = transcribe_path
         
-        assert response.status_code == 500
-        assert "Transcription failed" in response.json()["detail"]
+        response = await aclient.post("/v1/audio/transcriptions", files=audio_upload(b"spooled audio"))
+        
+        assert response.status_code == 200
+        assert seen["content"] == b"spooled audio"
+        assert not os.path.exists(seen["path"])
     
-    @patch('transcription_service.transcription_service.transcribe_audio')
-    def test_transcribe_audio_with_language(self, mock_transcribe):
-        """Test transcription with specific language"""
-        mock_transcribe.return_value = {
-            "text": "Bonjour le monde",
-            "segments": [],
-            "language": "fr"
-        }
+    @patch('main.get_transcription_service')
+    async def test_transcribe_audio_uses_shared_service(self, mock_get_service, aclient, audio_upload):
+        """Test that the endpoint transcribes through the shared service"""
+        fake_service = mock_get_service.return_value
+        
+        async def transcribe_path(*args, **kwargs):
+            return MOCK_SUCCESS
         
-        audio_content = b"fake audio content"
-        files = {"file": ("test.wav", io.BytesIO(audio_content), "audio/wav")}
-        data = {"language": "fr"}
+        fake_service.transcribe_path.side_effect = transcribe_path
         
-        response = client.post("/v1/audio/transcriptions", files=files, data=data)
+        response = await aclient.post("/v1/audio/transcriptions", files=audio_upload())
         
         assert response.status_code == 200
-        result = response.json()
-        assert result["text"] == "Bonjour le monde"
-        assert result["language"] == "fr"
-    
-    @patch('transcription_service.transcription_service.transcribe_audio')
-    def test_transcribe_audio_with_model(self, mock_transcribe):
-        """Test transcription with specific model"""
-        mock_transcribe.return_value = {
-            "text": "Hello from large model",
-            "segments": [],
-            "language": "en"
-        }
+        assert response.json()["text"] == "Hello world"
+        fake_service.transcribe_path.assert_called_once()
+    
+    @patch('main.get_transcription_service')
+    async def test_transcribe_audio_model_load_failure(self, mock_get_service, aclient, audio_upload):
+        """Test that a model that fails to load gives a JSON 503, while bad uploads still get a 400"""
+        mock_get_service.side_effect = RuntimeError("weights missing")
+        
+        response = await aclient.post("/v1/audio/transcriptions", files=audio_upload())
+        
+        assert response.status_code == 503
+        assert "weights missing" in response.json()["detail"]
         
-        audio_content = b"fake audio content"
-        files = {"file": ("test.wav", io.BytesIO(audio_content), "audio/wav")}
-        data = {"model": "large", "language": "en"}
+        response = await aclient.post("/v1/audio/transcriptions", files=audio_upload(b""))
+        
+        assert response.status_code == 400
+        assert "Empty file provided" in response.json()["detail"]
+    
+    @patch('main.get_transcription_service')
+    async def test_preload_transcription_service_failure(self, mock_get_service):
+        """Test that a failed model preload is logged instead of crashing startup"""
+        from main import _preload_transcription_service
         
-        response = client.post("/v1/audio/transcriptions", files=files, data=data)
+        mock_get_service.side_effect = RuntimeError("model download failed")
         
+        await _preload_transcription_service()
+        
+        mock_get_service.assert_called_once_with()
+    
+    async def test_transcribe_audio_empty_file(self, aclient, audio_upload):
+        """Test transcription with empty file"""
+        files = audio_upload(b"")
+        
+        response = await aclient.post("/v1/audio/transcriptions", files=files)
+        
+        assert response.status_code == 400
+        assert "Empty file provided" in response.json()["detail"]
+    
+    @patch('transcription_service.TranscriptionService.transcribe_path')
+    async def test_transcribe_audio_service_error(self, mock_transcribe, aclient, audio_upload):
+        """Test transcription when service raises an error"""
+        mock_transcribe.side_effect = Exception("Transcription failed")
+        
+        files = audio_upload()
+        
+        response = await aclient.post("/v1/audio/transcriptions", files=files)
+        
+        assert response.status_code == 500
+        assert "Transcription failed" in response.json()["detail"]
+    
+    async def test_models_endpoint_etag(self, aclient):
+        """Test the models endpoint supports conditional requests"""
+        response = await aclient.get("/v1/models")
         assert response.status_code == 200
-        result = response.json()
-        assert result["text"] == "Hello from large model"
-        assert result["language"] == "en"
-        
-        # Verify the service was called with the correct parameters
-        mock_transcribe.assert_called_once()
-        call_args = mock_transcribe.call_args
-        assert len(call_args[0]) == 3  # audio_content, language, model
-        assert call_args[0][1] == "en"  # language
-        assert call_args[0][2] == "large"  # model
\ No newline at end of file
+        etag = response.headers["etag"]
+        assert "max-age" in response.headers["cache-control"]
+        
+        response = await aclient.get("/v1/models", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
@@ -1,17 +1,28 @@
 import pytest
-from models_service import ModelsService
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+from config import Config, config
+from models_service import ModelsService, ModelPool, _has_model_file
 
 class TestModelsService:
     """Test cases for the ModelsService"""
     
+    @pytest.fixture(scope="class")
+    def service(self):
+        """Shared service for the tests that only read from it"""
+        return ModelsService()
+    
     def test_init(self):
         """Test service initialization"""
-        service = ModelsService("base")
-        assert service.current_model == "base"
+        service = ModelsService()
+        expected_cache_dir = config.get_effective_cache_dir() if config.ENABLE_EXTERNAL_STORAGE else None
+        assert service._effective_cache_dir == expected_cache_dir
+        assert service.get_available_models()[0]["name"] == "tiny"
     
-    def test_get_available_models(self):
+    def test_get_available_models(self, service):
         """Test getting available models"""
-        service = ModelsService()
         models = service.get_available_models()
         
         assert isinstance(models, list)
@@ -24,27 +35,18 @@ class TestModelsService:
         for expected in expected_models:
             assert expected in model_names
         
-        # Check model structure
-        for model in models:
-            assert "name" in model
-            assert "size" in model
-            assert "description" in model
-            assert "parameters" in model
-            assert "relative_speed" in model
-            assert "vram_required" in model
-        
-    def test_is_model_available(self):
-        """Test checking if model is available"""
-        service = ModelsService()
+        # Check model structure; lists any models missing a required field
+        required = {"name", "size", "description", "parameters", "relative_speed", "vram_required"}
+        assert [model for model in models if not required <= model.keys()] == []
         
+    def test_is_model_available(self, service):
+        """Test checking if model is available"""
         assert service.is_model_available("base") == True
         assert service.is_model_available("tiny") == True
         assert service.is_model_available("nonexistent") == False
     
-    def test_get_model_info(self):
+    def test_get_model_info(self, service):
         """Test getting specific model information"""
-        service = ModelsService()
-        
         info = service.get_model_info("base")
         assert info is not None
         assert info["name"] == "base"
@@ -52,18 +54,32 @@ class TestModelsService:
         info = service.get_model_info("nonexistent")
         assert info is None
     
-    def test_get_recommended_model(self):
-        """Test getting recommended models"""
+    def test_model_entries_are_read_only(self):
+        """Test that callers cannot mutate the shared model entries"""
         service = ModelsService()
         
+        with pytest.raises(TypeError):
+            service.get_model_info("base")["size"] = "tampered"
+        with pytest.raises(TypeError):
+            service.get_available_models()[0]["name"] = "tampered"
+        
+        status = service.get_models_with_status()[0]
+        status["name"] = "tampered"
+        status["downloaded"] = "tampered"
+        assert service.get_available_models()[0]["name"] == "tiny"
+        # Later calls within the cache TTL are not affected either
+        assert service.get_models_with_status()[0]["name"] == "tiny"
+        assert service.get_models_status_snapshot()[0][0]["downloaded"] != "tampered"
+    
+    def test_get_recommended_model(self, service):
+        """Test getting recommended models"""
         assert service.get_recommended_model("speed") == "tiny"
         assert service.get_recommended_model("balanced") == "base"
         assert service.get_recommended_model("accuracy") == "large-v3"
         assert service.get_recommended_model("unknown") == "base"  # default
     
-    def test_get_models_with_status(self):
+    def test_get_models_with_status(self, service):
         """Test getting models with download status"""
-        service = ModelsService()
         models = service.get_models_with_status()
         
         assert isinstance(models, list)
@@ -74,13 +90,211 @@ class TestModelsService:
             assert "downloaded" in model
             assert isinstance(model["downloaded"], bool)
     
-    def test_get_downloaded_models(self):
+    def test_get_downloaded_models(self, service):
         """Test getting list of downloaded models"""
-        service = ModelsService()
         downloaded = service.get_downloaded_models()
         
         assert isinstance(downloaded, list)
         # All items should be valid model names
-        available_names = [model["name"] for model in service.get_available_models()]
-        for model_name in downloaded:
-            assert model_name in available_names
\ No newline at end of file
+        available_names = {model["name"] for model in service.get_available_models()}
+        assert set(downloaded) <= available_names
+    
+    def test_is_model_downloaded_uses_cache(self):
+        """Test that repeated download checks reuse the cached result"""
+        service = ModelsService()
+        
+        with patch.object(service, "_scan_model_downloaded", return_value=True) as mock_scan:
+            assert service.is_model_downloaded("base") == True
+            assert service.is_model_downloaded("base") == True
+        
+        mock_scan.assert_called_once_with("base")
+    
+    def test_invalidate_download_cache(self):
+        """Test that invalidating the cache forces a fresh filesystem scan"""
+        service = ModelsService()
+        
+        with patch.object(service, "_scan_model_downloaded", side_effect=[False, True]) as mock_scan:
+            assert service.is_model_downloaded("base") == False
+            service.invalidate_download_cache("base")
+            assert service.is_model_downloaded("base") == True
+        
+        assert mock_scan.call_count == 2
+    
+    def test_has_model_file(self, tmp_path):
+        """Test that the model file probe finds nested and symlinked weights"""
+        assert _has_model_file(tmp_path) == False
+        
+        snapshot = tmp_path / "snapshots" / "abc123"
+        snapshot.mkdir(parents=True)
+        (snapshot / "config.json").write_text("{}")
+        assert _has_model_file(tmp_path) == False
+        
+        blob = tmp_path / "blobs" / "deadbeef"
+        blob.parent.mkdir()
+        blob.write_bytes(b"weights")
+        (snapshot / "model.bin").symlink_to(blob)
+        assert _has_model_file(tmp_path) == True
+        
+        assert _has_model_file(tmp_path / "missing") == False
+    
+    def test_has_model_file_matches_all_weight_suffixes(self, tmp_path):
+        """Test that one walk recognizes every weight file format"""
+        for filename in ["model.bin", "pytorch_model.bin", "model.safetensors", "model.ctranslate2"]:
+            model_dir = tmp_path / filename
+            (model_dir / "nested").mkdir(parents=True)
+            (model_dir / "nested" / filename).write_bytes(b"weights")
+            assert _has_model_file(model_dir) == True
+        
+        other_dir = tmp_path / "other"
+        other_dir.mkdir()
+        (other_dir / "model.bin.lock").write_text("")
+        assert _has_model_file(other_dir) == False
+    
+    def test_models_status_snapshot_is_cached(self):
+        """Test that the status listing is reused until the download cache is invalidated"""
+        service = ModelsService()
+        
+        models, etag = service.get_models_status_snapshot()
+        assert service.get_models_status_snapshot() == (models, etag)
+        
+        with patch.object(service, "is_model_downloaded", return_value=True):
+            assert service.get_models_status_snapshot()[1] == etag
+            service.invalidate_download_cache()
+            models, new_etag = service.get_models_status_snapshot()
+        
+        assert all(model["downloaded"] for model in models)
+        assert len(new_etag) == 16
+    
+    def test_is_model_downloaded_hf_cache(self, tmp_path, monkeypatch):
+        """Test that a model in the HuggingFace hub cache is detected"""
+        monkeypatch.setenv("HF_HOME", str(tmp_path))
+        service = ModelsService()
+        assert service.is_model_downloaded("tiny") == False
+        
+        snapshot = tmp_path / "hub" / "models--guillaumekln--faster-whisper-tiny" / "snapshots" / "abc123"
+        snapshot.mkdir(parents=True)
+        (snapshot / "model.bin").write_bytes(b"weights")
+        service.invalidate_download_cache("tiny")
+        
+        assert service.is_model_downloaded("tiny") == True
+    
+    @pytest.mark.asyncio
+    async def test_aget_downloaded_models(self):
+        """Test the concurrent download check matches the per-model checks"""
+        service = ModelsService()
+        
+        with patch.object(service, "_scan_model_downloaded", side_effect=lambda name: name in ("tiny", "small")):
+            downloaded = await service.aget_downloaded_models()
+        
+        assert downloaded == ["tiny", "small"]
+    
+    def test_refresh_cache_roots(self, tmp_path, monkeypatch):
+        """Test that a cache root created after startup is found once roots are refreshed"""
+        hf_home = tmp_path / "hf"
+        monkeypatch.setenv("HF_HOME", str(hf_home))
+        service = ModelsService()
+        assert service.is_model_downloaded("tiny") == False
+        
+        model_dir = hf_home / "faster-whisper-tiny"
+        model_dir.mkdir(parents=True)
+        (model_dir / "model.bin").write_bytes(b"weights")
+        service.invalidate_download_cache("tiny")
+        assert service.is_model_downloaded("tiny") == False
+        
+        service.refresh_cache_roots()
+        service.invalidate_download_cache("tiny")
+        assert service.is_model_downloaded("tiny") == True
+    
+    def test_reload_config(self, tmp_path, monkeypatch):
+        """Test that reloading the config picks up a new external cache directory"""
+        monkeypatch.setenv("HF_HOME", str(tmp_path / "hf"))
+        monkeypatch.setenv("TRANSFORMERS_CACHE", str(tmp_path / "hf"))
+        service = ModelsService()
+        assert service.is_model_downloaded("tiny") == False
+        
+        external_dir = tmp_path / "external"
+        (external_dir / "faster-whisper-tiny").mkdir(parents=True)
+        (external_dir / "faster-whisper-tiny" / "model.bin").write_bytes(b"weights")
+        monkeypatch.setattr(Config, "ENABLE_EXTERNAL_STORAGE", True)
+        monkeypatch.setattr(Config, "MODELS_CACHE_DIR", str(external_dir))
+        try:
+            service.reload_config()
+            
+            assert service._effective_cache_dir == str(external_dir)
+            assert service.is_model_downloaded("tiny") == True
+        finally:
+            monkeypatch.undo()
+            config.get_effective_cache_dir.cache_clear()
+    
+    def test_import_does_not_load_faster_whisper(self):
+        """Test that importing the models service leaves faster-whisper unloaded"""
+        result = subprocess.run(
+            [sys.executable, "-c", "import sys, models_service; print('faster_whisper' in sys.modules)"],
+            cwd=Path(__file__).resolve().parent.parent,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        
+        assert result.stdout.strip() == "False"
+    
+    def test_model_pool_reuses_and_evicts(self):
+        """Test that the model pool reuses loaded models and evicts the least recently used"""
+        pool = ModelPool(max_size=2)
+        loader = MagicMock(side_effect=lambda name, device, compute_type: f"model-{name}")
+        
+        assert pool.acquire("tiny", "cpu", "int8", loader) == "model-tiny"
+        assert pool.acquire("tiny", "cpu", "int8", loader) == "model-tiny"
+        assert loader.call_count == 1
+        
+        pool.acquire("base", "cpu", "int8", loader)
+        pool.acquire("tiny", "cpu", "int8", loader)
+        pool.acquire("small", "cpu", "int8", loader)
+        
+        assert pool.get("base", "cpu", "int8") is None
+        assert pool.get("tiny", "cpu", "int8") == "model-tiny"
+        assert loader.call_count == 3
+    
+    @patch('faster_whisper.utils.download_model')
+    @patch('faster_whisper.WhisperModel')
+    @pytest.mark.asyncio
+    async def test_download_model_fetches_files_only(self, mock_whisper_model, mock_download):
+        """Test that a successful download fetches the model files without loading the model"""
+        mock_download.return_value = "/cache/models--guillaumekln--faster-whisper-tiny/snapshots/abc123"
+        service = ModelsService()
+        
+        with patch.object(service, "_scan_model_downloaded", return_value=False):
+            result = await service.download_model("tiny")
+        
+        assert result["success"] == True
+        assert result["downloaded"] == True
+        mock_download.assert_called_once_with("tiny")
+        mock_whisper_model.assert_not_called()
+    
+    @patch('models_service.asyncio.sleep')
+    @patch('faster_whisper.utils.download_model')
+    @pytest.mark.asyncio
+    async def test_download_model_returns_without_waiting(self, mock_download, mock_sleep):
+        """Test that a download does not wait for the files to settle before returning"""
+        service = ModelsService()
+        
+        with patch.object(service, "_scan_model_downloaded", return_value=False) as mock_scan:
+            result = await service.download_model("tiny")
+        
+        assert result["success"] == True
+        mock_sleep.assert_not_called()
+        # Only the up-front "already downloaded?" check scans the filesystem
+        mock_scan.assert_called_once_with("tiny")
+    
+    @patch('faster_whisper.utils.download_model')
+    @pytest.mark.asyncio
+    async def test_download_model_failure(self, mock_download):
+        """Test that a failed download is reported instead of raised"""
+        mock_download.side_effect = RuntimeError("network unreachable")
+        service = ModelsService()
+        
+        with patch.object(service, "_scan_model_downloaded", return_value=False):
+            result = await service.download_model("tiny")
+        
+        assert result["success"] == False
+        assert "network unreachable" in result["message"]
@@ -0,0 +1,154 @@
+import pytest
+from datetime import datetime
+
+from request_logger import RequestLogger, RequestLog
+
+def log_sample_request(logger, method="GET", path="/v1/models", status=200, **overrides):
+    """Log a request with sensible defaults for the fields a test doesn't care about"""
+    fields = {
+        "method": method,
+        "path": path,
+        "query_params": {},
+        "headers": {"Authorization": "Bearer secret", "Accept": "application/json"},
+        "request_body": None,
+        "response_status": status,
+        "response_body": "{}",
+        "response_headers": {"content-type": "application/json"},
+        "processing_time_ms": 1.5,
+        "client_ip": "127.0.0.1",
+        "user_agent": "pytest",
+    }
+    fields.update(overrides)
+    return logger.log_request(**fields)
+
+class TestRequestLogger:
+    """Test cases for the RequestLogger"""
+    
+    def test_log_entry_uses_slots(self):
+        """Test that log entries don't carry a per-instance __dict__"""
+        assert hasattr(RequestLog, "__slots__")
+        
+        logger = RequestLogger()
+        log_sample_request(logger)
+        
+        assert not hasattr(logger.logs[0], "__dict__")
+    
+    def test_get_logs_returns_dicts(self):
+        """Test that logs are returned as plain dictionaries with redacted headers"""
+        logger = RequestLogger()
+        request_id = log_sample_request(logger)
+        
+        logs = logger.get_logs()
+        
+        assert len(logs) == 1
+        assert logs[0]["request_id"] == request_id
+        assert logs[0]["method"] == "GET"
+        assert logs[0]["headers"]["Authorization"] == "[REDACTED]"
+        assert logs[0]["headers"]["Accept"] == "application/json"
+    
+    def test_returned_logs_do_not_alias_stored_headers(self):
+        """Test that mutating a returned log leaves the stored entry untouched"""
+        logger = RequestLogger()
+        request_id = log_sample_request(logger)
+        
+        logger.get_logs()[0]["headers"]["Accept"] = "text/plain"
+        
+        assert logger.get_log_by_id(request_id)["headers"]["Accept"] == "application/json"
+    
+    def test_get_log_by_id_missing(self):
+        """Test looking up an unknown request ID"""
+        logger = RequestLogger()
+        
+        assert logger.get_log_by_id("req_missing") is None
+    
+    def test_get_stats(self):
+        """Test request statistics aggregation"""
+        logger = RequestLogger()
+        log_sample_request(logger, processing_time_ms=1.0)
+        log_sample_request(logger, processing_time_ms=2.0)
+        log_sample_request(logger, method="POST", path="/v1/audio/transcriptions", status=400, processing_time_ms=6.0)
+        
+        stats = logger.get_stats()
+        
+        assert stats["total_requests"] == 3
+        assert stats["avg_processing_time_ms"] == 3.0
+        assert stats["status_codes"] == {200: 2, 400: 1}
+        assert stats["methods"] == {"GET": 2, "POST": 1}
+        assert list(stats["paths"]) == ["/v1/models", "/v1/audio/transcriptions"]
+    
+    def test_get_stats_average_is_not_rounded(self):
+        """Test that the average processing time is returned at full precision"""
+        logger = RequestLogger()
+        for processing_time_ms in (1.0, 1.0, 2.0):
+            log_sample_request(logger, processing_time_ms=processing_time_ms)
+        
+        assert logger.get_stats()["avg_processing_time_ms"] == pytest.approx(4 / 3)
+    
+    def test_get_stats_empty(self):
+        """Test statistics when nothing has been logged"""
+        stats = RequestLogger().get_stats()
+        
+        assert stats == {
+            "total_requests": 0,
+            "avg_processing_time_ms": 0,
+            "status_codes": {},
+            "methods": {},
+            "paths": {}
+        }
+    
+    def test_get_logs_filters_and_limit(self):
+        """Test that logs come back newest first, filtered and limited"""
+        logger = RequestLogger()
+        first = log_sample_request(logger)
+        log_sample_request(logger, method="POST", path="/v1/audio/transcriptions")
+        last = log_sample_request(logger, status=404)
+        
+        assert [log["request_id"] for log in logger.get_logs(limit=2)][0] == last
+        assert len(logger.get_logs(limit=2)) == 2
+        assert [log["method"] for log in logger.get_logs(method_filter="post")] == ["POST"]
+        assert len(logger.get_logs(path_filter="/v1/models")) == 2
+        assert [log["request_id"] for log in logger.get_logs(status_filter=200, path_filter="models")] == [first]
+    
+    def test_log_timestamp_is_iso_formatted(self):
+        """Test that stored nanosecond timestamps are returned as ISO strings"""
+        logger = RequestLogger()
+        request_id = log_sample_request(logger)
+        
+        log = logger.get_log_by_id(request_id)
+        
+        assert "timestamp_ns" not in log
+        assert datetime.fromisoformat(log["timestamp"]).timestamp() == pytest.approx(logger.logs[0].timestamp_ns / 1e9, abs=1e-3)
+    
+    def test_get_log_by_id_follows_eviction(self):
+        """Test that the id index drops entries the deque has evicted"""
+        logger = RequestLogger(max_logs=2)
+        first = log_sample_request(logger)
+        second = log_sample_request(logger)
+        third = log_sample_request(logger)
+        
+        assert logger.get_log_by_id(first) is None
+        assert logger.get_log_by_id(second)["request_id"] == second
+        assert logger.get_log_by_id(third)["request_id"] == third
+        
+        logger.clear_logs()
+        assert logger.get_log_by_id(third) is None
+    
+    def test_long_bodies_are_truncated(self):
+        """Test that only bodies over the limit are truncated"""
+        logger = RequestLogger()
+        request_id = log_sample_request(logger, request_body="a" * 10000, response_body="b" * 10001)
+        
+        log = logger.get_log_by_id(request_id)
+        
+        assert log["request_body"] == "a" * 10000
+        assert log["response_body"] == "b" * 10000 + "... [TRUNCATED - Original length: 10001 chars]"
+    
+    def test_get_logs_order_follows_insertion(self, monkeypatch):
+        """Test that logs are returned newest first without sorting on timestamps"""
+        logger = RequestLogger()
+        # A wall clock stepping backwards must not reorder the logs
+        clock = iter([3_000_000_000, 2_000_000_000, 1_000_000_000])
+        monkeypatch.setattr("request_logger.time.time_ns", lambda: next(clock))
+        ids = [log_sample_request(logger) for _ in range(3)]
+        
+        assert [log["request_id"] for log in logger.get_logs()] == ids[::-1]
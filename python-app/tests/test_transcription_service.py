@@ -1,40 +1,75 @@
+import asyncio
+import io
+import subprocess
+import sys
+import threading
 import pytest
+import numpy as np
+from pathlib import Path
+from types import SimpleNamespace
 from unittest.mock import patch, MagicMock
-import tempfile
-import os
 
-from transcription_service import TranscriptionService
+from config import config
+from models_service import model_pool
+from transcription_service import TranscriptionService, DecodedAudioCache, get_transcription_service
+
+@pytest.fixture(autouse=True)
+def fake_decode_audio(monkeypatch):
+    """Decode any upload to one second of silence; the fake audio is not a real media file"""
+    mock_decode_audio = MagicMock(side_effect=lambda *args, **kwargs: np.zeros(16000, dtype=np.float32))
+    monkeypatch.setattr("faster_whisper.decode_audio", mock_decode_audio)
+    return mock_decode_audio
 
 class TestTranscriptionService:
     """Test cases for the TranscriptionService"""
     
-    @patch('transcription_service.WhisperModel')
-    def test_init(self, mock_whisper_model):
+    def test_init(self, whisper_model):
         """Test service initialization"""
-        mock_model = MagicMock()
-        mock_whisper_model.return_value = mock_model
+        mock_model = whisper_model.return_value
         
         service = TranscriptionService()
         
         assert service.model == mock_model
-        mock_whisper_model.assert_called_once_with("base", device="cpu", compute_type="int8")
+        whisper_model.assert_called_once_with("base", device="cpu", compute_type="int8", cpu_threads=config.WHISPER_CPU_THREADS, num_workers=1)
+        
+        # One warm-up pass over a second of silence loads the VAD model
+        mock_model.transcribe.assert_called_once()
+        warm_up_args, warm_up_kwargs = mock_model.transcribe.call_args
+        assert warm_up_args[0].shape == (16000,)
+        assert warm_up_kwargs["vad_filter"] == True
+        assert warm_up_kwargs["vad_parameters"] == {"threshold": 0.5, "min_silence_duration_ms": 2000}
+    
+    def test_import_does_not_load_faster_whisper(self):
+        """Test that importing the service neither loads faster-whisper nor a model"""
+        result = subprocess.run(
+            [sys.executable, "-c", "import sys, transcription_service; print('faster_whisper' in sys.modules)"],
+            cwd=Path(__file__).resolve().parent.parent,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        
+        assert result.stdout.strip() == "False"
+    
+    def test_get_transcription_service_is_shared(self, whisper_model, monkeypatch):
+        """Test that the service is created on first use and then reused"""
+        monkeypatch.setattr("transcription_service._service", None)
+        
+        service = get_transcription_service()
+        
+        assert get_transcription_service() is service
+        whisper_model.assert_called_once()
     
-    @patch('transcription_service.WhisperModel')
     @pytest.mark.asyncio
-    async def test_transcribe_audio_success(self, mock_whisper_model):
+    async def test_transcribe_audio_success(self, whisper_model):
         """Test successful audio transcription"""
         # Mock the Whisper model
-        mock_model = MagicMock()
-        mock_whisper_model.return_value = mock_model
+        mock_model = whisper_model.return_value
         
         # Mock transcription results
-        mock_segment = MagicMock()
-        mock_segment.start = 0.0
-        mock_segment.end = 2.0
-        mock_segment.text = "Hello world"
+        mock_segment = SimpleNamespace(start=0.0, end=2.0, text="Hello world")
         
-        mock_info = MagicMock()
-        mock_info.language = "en"
+        mock_info = SimpleNamespace(language="en")
         
         mock_model.transcribe.return_value = ([mock_segment], mock_info)
         
@@ -50,20 +85,14 @@ class TestTranscriptionService:
         assert result["segments"][0]["start"] == 0.0
         assert result["segments"][0]["end"] == 2.0
     
-    @patch('transcription_service.WhisperModel')
     @pytest.mark.asyncio
-    async def test_transcribe_audio_default_language(self, mock_whisper_model):
+    async def test_transcribe_audio_default_language(self, whisper_model):
         """Test transcription with default language"""
-        mock_model = MagicMock()
-        mock_whisper_model.return_value = mock_model
+        mock_model = whisper_model.return_value
         
-        mock_segment = MagicMock()
-        mock_segment.start = 0.0
-        mock_segment.end = 1.0
-        mock_segment.text = "Test"
+        mock_segment = SimpleNamespace(start=0.0, end=1.0, text="Test")
         
-        mock_info = MagicMock()
-        mock_info.language = "en"
+        mock_info = SimpleNamespace(language="en")
         
         mock_model.transcribe.return_value = ([mock_segment], mock_info)
         
@@ -72,26 +101,20 @@ class TestTranscriptionService:
         # Test transcription without language parameter
         result = await service.transcribe_audio(b"fake audio content")
         
-        # Verify the model was called with default language
-        mock_model.transcribe.assert_called_once()
+        # Verify the model was called with default language (after the warm-up call)
+        assert mock_model.transcribe.call_count == 2
         call_args = mock_model.transcribe.call_args
         assert call_args[1]["language"] == "en"  # Default language from config
     
-    @patch('transcription_service.WhisperModel')
-    @patch('transcription_service.os.unlink')
+    @patch('tempfile.NamedTemporaryFile')
     @pytest.mark.asyncio
-    async def test_temp_file_cleanup(self, mock_unlink, mock_whisper_model):
-        """Test that temporary files are cleaned up"""
-        mock_model = MagicMock()
-        mock_whisper_model.return_value = mock_model
+    async def test_transcribe_audio_decodes_in_memory(self, mock_tempfile, whisper_model, fake_decode_audio):
+        """Test that uploaded audio is decoded without a temporary file"""
+        mock_model = whisper_model.return_value
         
-        mock_segment = MagicMock()
-        mock_segment.start = 0.0
-        mock_segment.end = 1.0
-        mock_segment.text = "Test"
+        mock_segment = SimpleNamespace(start=0.0, end=1.0, text="Test")
         
-        mock_info = MagicMock()
-        mock_info.language = "en"
+        mock_info = SimpleNamespace(language="en")
         
         mock_model.transcribe.return_value = ([mock_segment], mock_info)
         
@@ -99,48 +122,131 @@ class TestTranscriptionService:
         
         await service.transcribe_audio(b"fake audio content")
         
-        # Verify temp file was deleted
-        mock_unlink.assert_called_once()
+        source = fake_decode_audio.call_args[0][0]
+        assert isinstance(source, io.BytesIO)
+        assert source.getvalue() == b"fake audio content"
+        assert fake_decode_audio.call_args[1] == {"sampling_rate": 16000}
+        assert isinstance(mock_model.transcribe.call_args[0][0], np.ndarray)
+        mock_tempfile.assert_not_called()
     
-    @patch('transcription_service.WhisperModel')
-    @patch('transcription_service.os.unlink')
     @pytest.mark.asyncio
-    async def test_temp_file_cleanup_on_error(self, mock_unlink, mock_whisper_model):
-        """Test that temporary files are cleaned up even when transcription fails"""
-        mock_model = MagicMock()
-        mock_whisper_model.return_value = mock_model
+    async def test_repeated_upload_reuses_decoded_audio(self, whisper_model, fake_decode_audio):
+        """Test that the same upload is only decoded once"""
+        mock_model = whisper_model.return_value
+        mock_model.transcribe.return_value = ([], SimpleNamespace(language="en"))
         
-        # Make transcription raise an exception
-        mock_model.transcribe.side_effect = Exception("Transcription failed")
+        service = TranscriptionService()
+        
+        await service.transcribe_audio(b"fake audio content")
+        await service.transcribe_audio(b"fake audio content")
+        await service.transcribe_audio(b"other audio content")
+        
+        assert fake_decode_audio.call_count == 2
+        first_audio = mock_model.transcribe.call_args_list[1][0][0]
+        assert mock_model.transcribe.call_args_list[2][0][0] is first_audio
+    
+    def test_decoded_audio_cache_evicts_by_size(self):
+        """Test that the decoded audio cache stays within its byte budget"""
+        cache = DecodedAudioCache(max_bytes=2 * 16000 * 4)
+        one_second = lambda: np.zeros(16000, dtype=np.float32)
+        
+        cache.put(b"a", one_second())
+        cache.put(b"b", one_second())
+        assert cache.get(b"a") is not None
+        cache.put(b"c", one_second())
+        
+        # "b" was the least recently used
+        assert cache.get(b"b") is None
+        assert cache.get(b"a") is not None
+        assert cache.get(b"c") is not None
+        
+        # Anything larger than the whole budget is not cached at all
+        cache.put(b"d", np.zeros(3 * 16000, dtype=np.float32))
+        assert cache.get(b"d") is None
+        assert cache.get(b"a") is not None
+    
+    @pytest.mark.asyncio
+    async def test_transcribe_audio_error(self, whisper_model):
+        """Test that transcription errors are propagated"""
+        mock_model = whisper_model.return_value
         
         service = TranscriptionService()
         
+        # Make transcription raise an exception
+        mock_model.transcribe.side_effect = Exception("Transcription failed")
+        
         with pytest.raises(Exception, match="Transcription failed"):
             await service.transcribe_audio(b"fake audio content")
+    
+    @pytest.mark.asyncio
+    async def test_transcription_runs_off_the_event_loop(self, whisper_model):
+        """Test that inference, including consuming the segments, happens in a worker thread"""
+        mock_model = whisper_model.return_value
+        segment_threads = []
+        
+        def segments():
+            segment_threads.append(threading.current_thread())
+            yield SimpleNamespace(start=0.0, end=1.0, text="Test")
+        
+        service = TranscriptionService()
+        mock_model.transcribe.side_effect = lambda *args, **kwargs: (segments(), SimpleNamespace(language="en"))
+        
+        result = await service.transcribe_audio(b"fake audio content")
         
-        # Verify temp file was still deleted
-        mock_unlink.assert_called_once()
+        assert result["text"] == "Test"
+        assert segment_threads[0] is not threading.main_thread()
     
-    @patch('transcription_service.WhisperModel')
     @pytest.mark.asyncio
-    async def test_multiple_segments(self, mock_whisper_model):
+    async def test_upload_is_hashed_off_the_event_loop(self, whisper_model, monkeypatch):
+        """Test that the decoded audio cache key is computed in a worker thread"""
+        mock_model = whisper_model.return_value
+        mock_model.transcribe.return_value = ([], SimpleNamespace(language="en"))
+        hash_threads = []
+        real_key = DecodedAudioCache.key
+        
+        def key(audio_content):
+            hash_threads.append(threading.current_thread())
+            return real_key(audio_content)
+        
+        monkeypatch.setattr(DecodedAudioCache, "key", staticmethod(key))
+        service = TranscriptionService()
+        
+        await service.transcribe_audio(b"fake audio content")
+        
+        assert len(hash_threads) == 1
+        assert hash_threads[0] is not threading.main_thread()
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_transcriptions_are_serialized(self, whisper_model):
+        """Test that one model never runs two transcriptions at once"""
+        mock_model = whisper_model.return_value
+        running = []
+        overlaps = []
+        
+        def transcribe(*args, **kwargs):
+            running.append(1)
+            overlaps.append(len(running))
+            threading.Event().wait(0.01)
+            running.pop()
+            return [], SimpleNamespace(language="en")
+        
+        service = TranscriptionService()
+        mock_model.transcribe.side_effect = transcribe
+        
+        await asyncio.gather(*(service.transcribe_audio(b"fake audio content") for _ in range(3)))
+        
+        assert overlaps == [1, 1, 1]
+    
+    @pytest.mark.asyncio
+    async def test_multiple_segments(self, whisper_model):
         """Test transcription with multiple segments"""
-        mock_model = MagicMock()
-        mock_whisper_model.return_value = mock_model
+        mock_model = whisper_model.return_value
         
         # Mock multiple segments
-        mock_segment1 = MagicMock()
-        mock_segment1.start = 0.0
-        mock_segment1.end = 2.0
-        mock_segment1.text = "Hello"
+        mock_segment1 = SimpleNamespace(start=0.0, end=2.0, text="Hello")
+        mock_segment2 = SimpleNamespace(start=2.0, end=4.0, text="world")
         
-        mock_segment2 = MagicMock()
-        mock_segment2.start = 2.0
-        mock_segment2.end = 4.0
-        mock_segment2.text = "world"
-        
-        mock_info = MagicMock()
-        mock_info.language = "en"
+        mock_info = SimpleNamespace(language="en")
         
         mock_model.transcribe.return_value = ([mock_segment1, mock_segment2], mock_info)
         
@@ -154,21 +260,183 @@ class TestTranscriptionService:
         assert result["segments"][1]["text"] == "world"
         assert result["segments"][0]["id"] == 0
         assert result["segments"][1]["id"] == 1
+        assert result["segments"][0]["tokens"] is not result["segments"][1]["tokens"]
+        
+        # Low-latency greedy decoding, with timestamps for the segment details
+        call_kwargs = mock_model.transcribe.call_args[1]
+        assert call_kwargs["beam_size"] == 1
+        assert call_kwargs["condition_on_previous_text"] == False
+        assert call_kwargs["temperature"] == (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+        assert call_kwargs["without_timestamps"] == False
+    
+    @pytest.mark.asyncio
+    async def test_transcribe_audio_without_segments(self, whisper_model):
+        """Test that the segment details can be left out of the result"""
+        mock_model = whisper_model.return_value
+        
+        mock_segment1 = SimpleNamespace(start=0.0, end=2.0, text="Hello")
+        mock_segment2 = SimpleNamespace(start=2.0, end=4.0, text="world")
+        
+        mock_info = SimpleNamespace(language="en")
+        
+        mock_model.transcribe.return_value = ([mock_segment1, mock_segment2], mock_info)
+        
+        service = TranscriptionService()
+        
+        result = await service.transcribe_audio(b"fake audio content", include_segments=False)
+        
+        assert result == {"text": "Hello world", "language": "en"}
+        assert mock_model.transcribe.call_args[1]["without_timestamps"] == True
+    
+    @pytest.mark.asyncio
+    async def test_transcribe_audio_column_layout(self, whisper_model):
+        """Test that segments can be returned as parallel lists"""
+        mock_model = whisper_model.return_value
+        
+        mock_segment1 = SimpleNamespace(start=0.0, end=2.0, text="Hello")
+        mock_segment2 = SimpleNamespace(start=2.0, end=4.0, text="world")
+        
+        mock_info = SimpleNamespace(language="en")
+        
+        mock_model.transcribe.return_value = ([mock_segment1, mock_segment2], mock_info)
+        
+        service = TranscriptionService()
+        
+        result = await service.transcribe_audio(b"fake audio content", segment_layout="columns")
+        
+        assert result == {
+            "text": "Hello world",
+            "language": "en",
+            "starts": [0.0, 2.0],
+            "ends": [2.0, 4.0],
+            "texts": ["Hello", "world"]
+        }
+    
+    @pytest.mark.asyncio
+    async def test_transcribe_audio_batches_speech_chunks(self, whisper_model, monkeypatch):
+        """Test that the batched pipeline is used when faster-whisper provides it"""
+        mock_model = whisper_model.return_value
+        mock_pipeline = MagicMock()
+        mock_pipeline.return_value.transcribe.return_value = ([SimpleNamespace(start=0.0, end=1.0, text="Batched")], SimpleNamespace(language="en"))
+        monkeypatch.setattr("faster_whisper.BatchedInferencePipeline", mock_pipeline, raising=False)
+        monkeypatch.setattr(config, "WHISPER_BATCH_SIZE", 8)
+        monkeypatch.setattr(config, "WHISPER_TEMPERATURE", (0.0,))
+        
+        service = TranscriptionService()
+        mock_model.transcribe.reset_mock()
+        
+        result = await service.transcribe_audio(b"fake audio content")
+        
+        assert result["text"] == "Batched"
+        mock_pipeline.assert_called_once_with(mock_model)
+        assert mock_pipeline.return_value.transcribe.call_args[1]["batch_size"] == 8
+        mock_model.transcribe.assert_not_called()
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("temperature, condition_prev", [
+        ((0.0, 0.2, 0.4), False),
+        ((0.0,), True),
+    ])
+    async def test_transcribe_audio_sequential_when_batching_drops_settings(self, whisper_model, monkeypatch, temperature, condition_prev):
+        """Test that a temperature fallback or conditioning on previous text keeps the sequential path"""
+        mock_model = whisper_model.return_value
+        mock_model.transcribe.return_value = ([SimpleNamespace(start=0.0, end=1.0, text="Sequential")], SimpleNamespace(language="en"))
+        mock_pipeline = MagicMock()
+        monkeypatch.setattr("faster_whisper.BatchedInferencePipeline", mock_pipeline, raising=False)
+        monkeypatch.setattr(config, "WHISPER_BATCH_SIZE", 8)
+        monkeypatch.setattr(config, "WHISPER_TEMPERATURE", temperature)
+        monkeypatch.setattr(config, "WHISPER_CONDITION_PREV", condition_prev)
+        
+        service = TranscriptionService()
+        
+        result = await service.transcribe_audio(b"fake audio content")
+        
+        assert result["text"] == "Sequential"
+        mock_pipeline.assert_not_called()
+        assert mock_model.transcribe.call_args[1]["temperature"] == temperature
+        assert mock_model.transcribe.call_args[1]["condition_on_previous_text"] == condition_prev
+        assert "batch_size" not in mock_model.transcribe.call_args[1]
     
-    @patch('transcription_service.WhisperModel')
     @pytest.mark.asyncio
-    async def test_transcribe_audio_with_model_name(self, mock_whisper_model):
+    async def test_transcribe_stream(self, whisper_model):
+        """Test that streamed transcription yields each segment, then the full text"""
+        mock_model = whisper_model.return_value
+        
+        mock_segment1 = SimpleNamespace(start=0.0, end=2.0, text="Hello")
+        mock_segment2 = SimpleNamespace(start=2.0, end=4.0, text="world")
+        
+        mock_info = SimpleNamespace(language="en")
+        
+        mock_model.transcribe.return_value = (iter([mock_segment1, mock_segment2]), mock_info)
+        
+        service = TranscriptionService()
+        
+        events = [event async for event in service.transcribe_stream("/tmp/upload.wav", "en")]
+        
+        assert [event["type"] for event in events] == ["transcript.text.delta", "transcript.text.delta", "transcript.text.done"]
+        assert [event["delta"] for event in events[:2]] == ["Hello", "world"]
+        assert events[1]["segment"]["id"] == 1
+        assert events[1]["segment"]["start"] == 2.0
+        assert events[2] == {"type": "transcript.text.done", "text": "Hello world", "language": "en"}
+        
+        # The model is free again for the next request
+        assert not service._lock.locked()
+    
+    @pytest.mark.asyncio
+    async def test_transcribe_stream_error(self, whisper_model):
+        """Test that a failure in the worker thread is raised to the consumer"""
+        mock_model = whisper_model.return_value
+        
+        service = TranscriptionService()
+        mock_model.transcribe.side_effect = Exception("Transcription failed")
+        
+        with pytest.raises(Exception, match="Transcription failed"):
+            async for _ in service.transcribe_stream("/tmp/upload.wav", "en"):
+                pass
+        
+        assert not service._lock.locked()
+    
+    @pytest.mark.asyncio
+    async def test_transcribe_stream_closed_early(self, whisper_model):
+        """Test that a consumer stopping early stops decoding and frees the model"""
+        mock_model = whisper_model.return_value
+        produced = []
+        closed = threading.Event()
+        
+        def segments():
+            for i in range(100):
+                produced.append(i)
+                yield SimpleNamespace(start=float(i), end=float(i + 1), text=f"word{i}")
+                # Hold the decoder until the consumer has gone away
+                closed.wait(timeout=5)
+        
+        mock_model.transcribe.return_value = (segments(), SimpleNamespace(language="en"))
+        
+        service = TranscriptionService()
+        
+        stream = service.transcribe_stream(np.zeros(16000, dtype=np.float32), "en")
+        first = await stream.__anext__()
+        await stream.aclose()
+        closed.set()
+        
+        # The worker sees the cancellation at its next segment and releases the lock
+        for _ in range(100):
+            if not service._lock.locked():
+                break
+            await asyncio.sleep(0.01)
+        
+        assert first["delta"] == "word0"
+        assert not service._lock.locked()
+        assert produced == [0, 1]
+    
+    @pytest.mark.asyncio
+    async def test_transcribe_audio_with_model_name(self, whisper_model):
         """Test transcription with specific model name"""
-        mock_model = MagicMock()
-        mock_whisper_model.return_value = mock_model
+        mock_model = whisper_model.return_value
         
-        mock_segment = MagicMock()
-        mock_segment.start = 0.0
-        mock_segment.end = 1.0
-        mock_segment.text = "Test with large model"
+        mock_segment = SimpleNamespace(start=0.0, end=1.0, text="Test with large model")
         
-        mock_info = MagicMock()
-        mock_info.language = "en"
+        mock_info = SimpleNamespace(language="en")
         
         mock_model.transcribe.return_value = ([mock_segment], mock_info)
         
@@ -182,27 +450,95 @@ class TestTranscriptionService:
         assert result["language"] == "en"
         
         # Verify that WhisperModel was called twice (once for init, once for model switch)
-        assert mock_whisper_model.call_count == 2
+        assert whisper_model.call_count == 2
         # Check the second call was with the new model
-        mock_whisper_model.assert_called_with("large", device="cpu", compute_type="int8")
+        whisper_model.assert_called_with("large", device="cpu", compute_type="int8", cpu_threads=config.WHISPER_CPU_THREADS, num_workers=1)
     
-    @patch('transcription_service.WhisperModel')
     @pytest.mark.asyncio
-    async def test_transcribe_audio_default_model_name(self, mock_whisper_model):
+    async def test_model_toggle_reuses_loaded_models(self, whisper_model, monkeypatch):
+        """Test that switching back to a recently used model does not reload it"""
+        mock_model = whisper_model.return_value
+        mock_model.transcribe.return_value = ([], SimpleNamespace(language="en"))
+        monkeypatch.setattr(model_pool, "max_size", 2)
+        
+        service = TranscriptionService()
+        await service.transcribe_audio(b"fake audio content", "en", "large")
+        await service.transcribe_audio(b"fake audio content", "en", "base")
+        await service.transcribe_audio(b"fake audio content", "en", "large")
+        
+        # Loaded once at init ("base") and once for "large"
+        assert whisper_model.call_count == 2
+        
+        # The same model on another device is a separate load
+        await service.transcribe_audio(b"fake audio content", "en", "large", device="cuda")
+        assert whisper_model.call_count == 3
+    
+    @pytest.mark.asyncio
+    async def test_model_switch_frees_previous_model_by_default(self, whisper_model):
+        """Test that only the active model stays loaded with the default pool size"""
+        mock_model = whisper_model.return_value
+        mock_model.transcribe.return_value = ([], SimpleNamespace(language="en"))
+        
+        service = TranscriptionService()
+        initial_key = service.current_model_key
+        await service.transcribe_audio(b"fake audio content", "en", "large")
+        
+        assert model_pool.get(*service.current_model_key) is service.model
+        assert model_pool.get(*initial_key) is None
+        
+        # Switching back has to load the model again
+        await service.transcribe_audio(b"fake audio content", "en", config.DEFAULT_WHISPER_MODEL)
+        assert whisper_model.call_count == 3
+    
+    @pytest.mark.asyncio
+    async def test_failed_model_switch_keeps_previous_model(self, whisper_model):
+        """Test that a model that fails to load does not replace the active one"""
+        base_model = whisper_model.return_value
+        base_model.transcribe.return_value = ([], SimpleNamespace(language="en"))
+        
+        service = TranscriptionService()
+        whisper_model.side_effect = RuntimeError("download failed")
+        
+        with pytest.raises(RuntimeError, match="download failed"):
+            await service.transcribe_audio(b"fake audio content", "en", "large")
+        
+        assert service.model is base_model
+        assert service.current_model_name == config.DEFAULT_WHISPER_MODEL
+        
+        # The next request for the model tries to load it again
+        large_model = MagicMock()
+        large_model.transcribe.return_value = ([], SimpleNamespace(language="en"))
+        whisper_model.side_effect = None
+        whisper_model.return_value = large_model
+        
+        await service.transcribe_audio(b"fake audio content", "en", "large")
+        
+        assert service.model is large_model
+        assert service.current_model_name == "large"
+        large_model.transcribe.assert_called_once()
+    
+    @pytest.mark.asyncio
+    async def test_transcribe_audio_uses_device_compute_type(self, whisper_model):
+        """Test that models are loaded with the compute type configured for their device"""
+        mock_model = whisper_model.return_value
+        mock_model.transcribe.return_value = ([], SimpleNamespace(language="en"))
+        
+        service = TranscriptionService()
+        await service.transcribe_audio(b"fake audio content", "en", "small", device="cuda")
+        
+        whisper_model.assert_called_with("small", device="cuda", compute_type="int8_float16", cpu_threads=config.WHISPER_CPU_THREADS, num_workers=1)
+    
+    @pytest.mark.asyncio
+    async def test_transcribe_audio_default_model_name(self, whisper_model):
         """Test transcription with default model name (no switching)"""
-        mock_model = MagicMock()
-        mock_whisper_model.return_value = mock_model
+        mock_model = whisper_model.return_value
         
         # Mock the model_name attribute to match config default
         mock_model.model_name = "base"
         
-        mock_segment = MagicMock()
-        mock_segment.start = 0.0
-        mock_segment.end = 1.0
-        mock_segment.text = "Test with default model"
+        mock_segment = SimpleNamespace(start=0.0, end=1.0, text="Test with default model")
         
-        mock_info = MagicMock()
-        mock_info.language = "en"
+        mock_info = SimpleNamespace(language="en")
         
         mock_model.transcribe.return_value = ([mock_segment], mock_info)
         
@@ -217,4 +553,44 @@ class TestTranscriptionService:
         assert result["language"] == "en"
         
         # Verify that WhisperModel was called only once during init (no model switching)
-        assert mock_whisper_model.call_count == 1
\ No newline at end of file
+        assert whisper_model.call_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_transcribe_path(self, whisper_model, fake_decode_audio, tmp_path):
+        """Test transcribing a file on disk decodes it from its path"""
+        mock_model = whisper_model.return_value
+        
+        mock_segment = SimpleNamespace(start=0.0, end=1.0, text="Test from path")
+        
+        mock_info = SimpleNamespace(language="en")
+        
+        mock_model.transcribe.return_value = ([mock_segment], mock_info)
+        
+        audio_path = tmp_path / "upload.wav"
+        audio_path.write_bytes(b"fake audio content")
+        
+        service = TranscriptionService()
+        
+        result = await service.transcribe_path(str(audio_path), "en")
+        
+        assert result["text"] == "Test from path"
+        fake_decode_audio.assert_called_once_with(str(audio_path), sampling_rate=16000)
+        assert isinstance(mock_model.transcribe.call_args[0][0], np.ndarray)
+    
+    @pytest.mark.asyncio
+    async def test_transcribe_path_retry_reuses_decoded_audio(self, whisper_model, fake_decode_audio, tmp_path):
+        """Test that retrying a file with another language skips decoding it again"""
+        mock_model = whisper_model.return_value
+        mock_model.transcribe.return_value = ([], SimpleNamespace(language="de"))
+        
+        audio_path = tmp_path / "upload.wav"
+        audio_path.write_bytes(b"fake audio content")
+        
+        service = TranscriptionService()
+        
+        await service.transcribe_path(str(audio_path), "en")
+        await service.transcribe_path(str(audio_path), "de")
+        # The in-memory path shares the cache, keyed by the same content hash
+        await service.transcribe_audio(b"fake audio content", "fr")
+        
+        assert fake_decode_audio.call_count == 1
@@ -1,27 +1,145 @@
-from faster_whisper import WhisperModel
-import tempfile
-import os
+import asyncio
+import hashlib
+import io
 import logging
-from typing import Dict, List, Any
+import numpy as np
+import threading
+from collections import OrderedDict
+from typing import AsyncIterator, BinaryIO, Dict, List, Any, Optional, TypedDict, Union
 from config import config
+from models_service import model_pool
 
 logger = logging.getLogger(__name__)
 
+# faster-whisper (and CTranslate2 with it) is imported where it is first
+# needed, so importing this module stays cheap
+
+def _load_whisper_model(model_name: str, device: str, compute_type: str) -> Any:
+    """Load a Whisper model with the configured CPU thread count"""
+    from faster_whisper import WhisperModel
+    # Transcriptions on one model are serialized, so a single worker is enough
+    return WhisperModel(model_name, device=device, compute_type=compute_type, cpu_threads=config.WHISPER_CPU_THREADS, num_workers=1)
+
+# Whisper models expect 16kHz mono audio
+SAMPLING_RATE = 16000
+
+class DecodedAudioCache:
+    """LRU cache of decoded audio arrays keyed by a hash of the encoded upload, bounded by total size"""
+    
+    def __init__(self, max_bytes: int):
+        """Initialize the cache, keeping at most max_bytes of decoded samples"""
+        self.max_bytes = max_bytes
+        self._arrays: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._total_bytes = 0
+    
+    @staticmethod
+    def key(audio_content: bytes) -> bytes:
+        """Get the cache key for encoded audio content"""
+        return hashlib.blake2b(audio_content, digest_size=16).digest()
+    
+    @staticmethod
+    def file_key(path: str) -> bytes:
+        """Get the cache key for the encoded audio in a file, equal to key() of its content"""
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            while chunk := f.read(1 << 20):
+                digest.update(chunk)
+        return digest.digest()
+    
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        """Get a decoded array, marking it as most recently used"""
+        audio = self._arrays.get(key)
+        if audio is not None:
+            self._arrays.move_to_end(key)
+        return audio
+    
+    def put(self, key: bytes, audio: np.ndarray):
+        """Add a decoded array, evicting the least recently used ones beyond max_bytes"""
+        if audio.nbytes > self.max_bytes:
+            return
+        previous = self._arrays.pop(key, None)
+        if previous is not None:
+            self._total_bytes -= previous.nbytes
+        self._arrays[key] = audio
+        self._total_bytes += audio.nbytes
+        while self._total_bytes > self.max_bytes:
+            _, evicted = self._arrays.popitem(last=False)
+            self._total_bytes -= evicted.nbytes
+    
+    def clear(self):
+        """Drop all cached arrays"""
+        self._arrays.clear()
+        self._total_bytes = 0
+
+class Segment(TypedDict):
+    """One transcribed segment, as in OpenAI's verbose_json response"""
+    id: int
+    seek: int
+    start: float
+    end: float
+    text: str
+    tokens: List[int]
+    temperature: float
+
+class TranscriptionResult(TypedDict, total=False):
+    """Transcription result; holds segments or starts/ends/texts depending on the segment layout"""
+    text: str
+    language: str
+    segments: List[Segment]
+    starts: List[float]
+    ends: List[float]
+    texts: List[str]
+
+# Fields faster-whisper has no equivalent for, filled in for OpenAI compatibility
+_SEGMENT_DEFAULTS = {"seek": 0, "temperature": 0.0}
+
 class TranscriptionService:
     """Service for handling audio transcription using Whisper model"""
     
     def __init__(self):
         """Initialize the Whisper model"""
-        logger.info(f"Initializing with default Whisper model: {config.DEFAULT_WHISPER_MODEL}")
+        logger.info("Initializing with default Whisper model: %s", config.DEFAULT_WHISPER_MODEL)
         self.current_model_name = config.DEFAULT_WHISPER_MODEL
-        self.model = WhisperModel(
-            config.DEFAULT_WHISPER_MODEL, 
-            device=config.WHISPER_DEVICE, 
-            compute_type=config.WHISPER_COMPUTE_TYPE
+        # (model_name, device, compute_type) of the active model, the same key
+        # the model pool uses
+        self.current_model_key = (
+            config.DEFAULT_WHISPER_MODEL,
+            config.WHISPER_DEVICE,
+            config.get_compute_type(config.WHISPER_DEVICE)
         )
+        self.model = model_pool.acquire(*self.current_model_key, loader=_load_whisper_model)
+        # faster-whisper models are not safe to call from several threads at
+        # once, and a model switch replaces self.model, so both happen under
+        # this lock
+        self._lock = asyncio.Lock()
+        # Retried or repeated uploads skip demuxing and resampling
+        self.decoded_audio = DecodedAudioCache(config.DECODED_AUDIO_CACHE_BYTES)
+        self.vad_parameters = {
+            "threshold": config.VAD_THRESHOLD,
+            "min_silence_duration_ms": config.VAD_MIN_SILENCE_DURATION_MS
+        }
+        self.decode_options = {
+            "beam_size": config.WHISPER_BEAM_SIZE,
+            "condition_on_previous_text": config.WHISPER_CONDITION_PREV,
+            "temperature": config.WHISPER_TEMPERATURE
+        }
+        self._warm_up()
         logger.info("Whisper model initialized successfully")
     
-    async def transcribe_audio(self, audio_content: bytes, language: str = None, model_name: str = None, device: str = None) -> Dict[str, Any]:
+    def _warm_up(self):
+        """Load the VAD model up front so the first request doesn't pay for it"""
+        # One second of silence: VAD runs eagerly inside transcribe() and finds
+        # no speech, so the lazy segment generator has nothing to decode. The
+        # language is given to skip language detection on the empty audio.
+        # faster-whisper keeps the loaded Silero session for later calls.
+        self.model.transcribe(
+            np.zeros(SAMPLING_RATE, dtype=np.float32),
+            language=config.DEFAULT_LANGUAGE,
+            vad_filter=True,
+            vad_parameters=self.vad_parameters
+        )
+    
+    async def transcribe_audio(self, audio_content: bytes, language: str = None, model_name: str = None, device: str = None, include_segments: bool = True, segment_layout: str = "objects") -> TranscriptionResult:
         """
         Transcribe audio content to text
         
@@ -29,13 +147,60 @@ class TranscriptionService:
             audio_content: Raw audio file content
             language: Language code for transcription (optional)
             model_name: Whisper model name to use for transcription (optional)
+            include_segments: Whether to include per-segment details in the result
+            segment_layout: "objects" for a list of segment dicts, "columns" for
+                parallel starts/ends/texts lists
             
         Returns:
             Dictionary containing transcription results
         """
 
-        logger.info(f"TranscriptionService transcribe_audio called with (model='{model_name}' lang='{language}')")
+        logger.info("TranscriptionService transcribe_audio called with (model=%r lang=%r)", model_name, language)
 
+        # Decode from memory, so the upload never has to be written to (and
+        # removed from) disk, and hand the model 16kHz float32 samples; hashing
+        # a large upload takes a while, so it stays off the event loop too
+        key = await asyncio.to_thread(self.decoded_audio.key, audio_content)
+        audio = await self._decode_cached(key, io.BytesIO(audio_content))
+        return await self._transcribe(audio, language, model_name, device, include_segments, segment_layout)
+    
+    async def transcribe_path(self, audio_path: str, language: str = None, model_name: str = None, device: str = None, include_segments: bool = True, segment_layout: str = "objects") -> TranscriptionResult:
+        """
+        Transcribe an audio file that is already on disk
+        
+        Args:
+            audio_path: Path to the audio file, owned and cleaned up by the caller
+            language: Language code for transcription (optional)
+            model_name: Whisper model name to use for transcription (optional)
+            include_segments: Whether to include per-segment details in the result
+            segment_layout: "objects" for a list of segment dicts, "columns" for
+                parallel starts/ends/texts lists
+            
+        Returns:
+            Dictionary containing transcription results
+        """
+        audio = await self.decode_path(audio_path)
+        return await self._transcribe(audio, language, model_name, device, include_segments, segment_layout)
+    
+    async def decode_path(self, audio_path: str) -> np.ndarray:
+        """Decode an audio file to 16kHz float32 samples, after which the file is no longer needed"""
+        # Hashing the file is far cheaper than demuxing and resampling it, so a
+        # retry of the same upload (say with another language or model) reuses
+        # the decoded samples
+        key = await asyncio.to_thread(self.decoded_audio.file_key, audio_path)
+        return await self._decode_cached(key, audio_path)
+    
+    async def _decode_cached(self, key: bytes, source: Union[str, BinaryIO]) -> np.ndarray:
+        """Decode audio to 16kHz float32 samples, reusing the result for content decoded before"""
+        audio = self.decoded_audio.get(key)
+        if audio is None:
+            from faster_whisper import decode_audio
+            audio = await asyncio.to_thread(decode_audio, source, sampling_rate=SAMPLING_RATE)
+            self.decoded_audio.put(key, audio)
+        return audio
+    
+    async def _transcribe(self, audio: Union[str, BinaryIO, np.ndarray], language: str = None, model_name: str = None, device: str = None, include_segments: bool = True, segment_layout: str = "objects") -> TranscriptionResult:
+        """Transcribe audio from a file path, a binary file object or decoded samples"""
         if language is None:
             language = config.DEFAULT_LANGUAGE
         
@@ -46,62 +211,204 @@ class TranscriptionService:
         if device is None:
             device = config.WHISPER_DEVICE
         
-        # Check if we need to switch models
-        if model_name != self.current_model_name:
-            logger.info(f"Switching from model '{self.current_model_name}' to '{model_name}'")
-            self.current_model_name = model_name
-            self.model = WhisperModel(
-                model_name,
-                device=device,
-                compute_type=config.WHISPER_COMPUTE_TYPE
-            )
-            
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=config.TEMP_FILE_SUFFIX) as temp_file:
-            temp_file.write(audio_content)
-            temp_file.flush()
-            
-            try:
-                logger.info(f"Transcribing audio file: {temp_file.name}")
+        try:
+            async with self._lock:
+                await self._switch_model(model_name, device)
                 
-                # Transcribe the audio
-                segments, info = self.model.transcribe(
-                    temp_file.name,
-                    language=language,
-                    vad_filter=True
-                )
+                logger.info("Transcribing audio: %s", audio if isinstance(audio, str) else "in-memory upload")
                 
-                # Format response to match OpenAI API
-                formatted_segments = []
-                for i, segment in enumerate(segments):
+                # Transcribe the audio in a worker thread so other requests
+                # keep being served meanwhile
+                runner, options = self._runner_and_options(include_segments)
+                segments, info = await asyncio.to_thread(self._run_transcription, runner, audio, language, options)
+            
+            # Format response to match OpenAI API in a single pass; segment
+            # dicts are only built when the caller wants them
+            columns = segment_layout == "columns"
+            text_parts = []
+            formatted_segments: List[Segment] = []
+            starts = []
+            ends = []
+            for i, segment in enumerate(segments):
+                text_parts.append(segment.text)
+                if not include_segments:
+                    continue
+                if columns:
+                    starts.append(segment.start)
+                    ends.append(segment.end)
+                else:
                     formatted_segments.append({
+                        **_SEGMENT_DEFAULTS,
                         "id": i,
-                        "seek": 0,
                         "start": segment.start,
                         "end": segment.end,
                         "text": segment.text,
                         "tokens": [],
-                        "temperature": 0.0,
                     })
-                
-                result = {
-                    "text": " ".join(seg["text"] for seg in formatted_segments),
-                    "segments": formatted_segments,
-                    "language": info.language
-                }
-                
-                logger.info(f"Transcription completed. Language: {info.language}, Segments: {len(formatted_segments)}")
-                return result
-                
+            
+            result: TranscriptionResult = {
+                "text": " ".join(text_parts),
+                "language": info.language
+            }
+            if include_segments and columns:
+                # Segment i is (starts[i], ends[i], texts[i]); no per-segment
+                # dicts or repeated keys to build and serialize
+                result.update(starts=starts, ends=ends, texts=text_parts)
+            elif include_segments:
+                result["segments"] = formatted_segments
+            
+            logger.info("Transcription completed. Language: %s, Segments: %d", info.language, len(text_parts))
+            return result
+            
+        except Exception as e:
+            logger.error("Error during transcription: %s", e)
+            raise
+    
+    async def transcribe_stream(self, audio: Union[str, BinaryIO, np.ndarray], language: str = None, model_name: str = None, device: str = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Transcribe audio, yielding each segment as soon as it is decoded
+        
+        Args:
+            audio: Path to, binary file object with, or decoded samples of the audio
+            language: Language code for transcription (optional)
+            model_name: Whisper model name to use for transcription (optional)
+            
+        Yields:
+            A "transcript.text.delta" event per segment, then one
+            "transcript.text.done" event with the full text and language
+        """
+        if language is None:
+            language = config.DEFAULT_LANGUAGE
+        
+        if model_name is None:
+            model_name = config.DEFAULT_WHISPER_MODEL
+
+        if device is None:
+            device = config.WHISPER_DEVICE
+        
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+        
+        def emit(kind: str, value: Any):
+            loop.call_soon_threadsafe(events.put_nowait, (kind, value))
+        
+        def run(runner: Any, options: Dict[str, Any]):
+            # Runs in a worker thread; hands segments to the event loop as the
+            # decoder produces them
+            try:
+                segments, info = runner.transcribe(audio, language=language, **options)
+                for segment in segments:
+                    if cancelled.is_set():
+                        return
+                    emit("segment", segment)
+                emit("done", info)
             except Exception as e:
-                logger.error(f"Error during transcription: {str(e)}")
-                raise
-            finally:
-                # Clean up temp file
-                try:
-                    os.unlink(temp_file.name)
-                except OSError as e:
-                    logger.warning(f"Failed to delete temp file {temp_file.name}: {str(e)}")
+                emit("error", e)
+        
+        await self._lock.acquire()
+        try:
+            await self._switch_model(model_name, device)
+            runner, options = self._runner_and_options(include_segments=True)
+            worker = asyncio.ensure_future(asyncio.to_thread(run, runner, options))
+        except BaseException:
+            self._lock.release()
+            raise
+        # The model is busy until the worker returns, even when the consumer
+        # stops early, so the lock is released from the worker rather than here
+        worker.add_done_callback(lambda _: self._lock.release())
+        
+        try:
+            text_parts = []
+            while True:
+                kind, value = await events.get()
+                if kind != "segment":
+                    # The worker has nothing left to do; let it finish so the
+                    # model is free before the final event goes out
+                    await worker
+                if kind == "error":
+                    logger.error("Error during transcription: %s", value)
+                    raise value
+                if kind == "done":
+                    logger.info("Streamed transcription completed. Language: %s, Segments: %d", value.language, len(text_parts))
+                    yield {"type": "transcript.text.done", "text": " ".join(text_parts), "language": value.language}
+                    return
+                yield {
+                    "type": "transcript.text.delta",
+                    "delta": value.text,
+                    "segment": {
+                        **_SEGMENT_DEFAULTS,
+                        "id": len(text_parts),
+                        "start": value.start,
+                        "end": value.end,
+                        "text": value.text,
+                        "tokens": [],
+                    }
+                }
+                text_parts.append(value.text)
+        finally:
+            # Stop decoding after the current segment if the consumer went away
+            cancelled.set()
+    
+    async def _switch_model(self, model_name: str, device: str):
+        """Make the given model active; must be called with the lock held"""
+        # A different device needs its own copy of the weights even when the
+        # model name is unchanged
+        model_key = (model_name, device, config.get_compute_type(device))
+        if model_key != self.current_model_key:
+            logger.info("Switching from model %r to %r on %s", self.current_model_name, model_name, device)
+            # Reuses weights still in the pool from an earlier switch;
+            # loading may read from disk, so keep it off the event loop
+            model = await asyncio.to_thread(model_pool.acquire, *model_key, loader=_load_whisper_model)
+            # Only record the switch once it succeeded, so a failed or
+            # cancelled load leaves the previous model active and consistent
+            self.model = model
+            self.current_model_name = model_name
+            self.current_model_key = model_key
+    
+    def _runner_and_options(self, include_segments: bool):
+        """Get the active model (or a batched pipeline over it) and the transcribe() options to run it with"""
+        options = {
+            "vad_filter": True,
+            "vad_parameters": self.vad_parameters,
+            **self.decode_options,
+            # Timestamps are only needed for the segment details
+            "without_timestamps": not include_segments
+        }
+        runner = self.model
+        # Added in faster-whisper 1.1; older versions decode one window at a time
+        import faster_whisper
+        BatchedInferencePipeline = getattr(faster_whisper, "BatchedInferencePipeline", None)
+        # The batched pipeline only decodes at the first temperature and never
+        # conditions on the previous text, so a temperature fallback or
+        # conditioning keeps the sequential path
+        sequential_only = len(self.decode_options["temperature"]) > 1 or self.decode_options["condition_on_previous_text"]
+        if BatchedInferencePipeline is not None and config.WHISPER_BATCH_SIZE > 1 and not sequential_only:
+            # Runs the encoder and decoder over up to batch_size speech
+            # chunks at once instead of one 30s window after another
+            runner = BatchedInferencePipeline(self.model)
+            options["batch_size"] = config.WHISPER_BATCH_SIZE
+        return runner, options
+    
+    @staticmethod
+    def _run_transcription(model: Any, audio: Union[str, BinaryIO, np.ndarray], language: str, options: Dict[str, Any]):
+        """Run the model and collect its segments; called from a worker thread"""
+        segments, info = model.transcribe(audio, language=language, **options)
+        # segments is a lazy generator that does the actual decoding, so it
+        # has to be consumed here rather than back on the event loop
+        return list(segments), info
+
+# Shared service, created on first use; see get_transcription_service
+_service: Optional[TranscriptionService] = None
+_service_lock = threading.Lock()
 
-# Global instance
-transcription_service = TranscriptionService()
\ No newline at end of file
+def get_transcription_service() -> TranscriptionService:
+    """Get the shared transcription service, loading the default model on first use"""
+    global _service
+    if _service is None:
+        # Requests can arrive while the startup preload is still loading the
+        # model; they wait for it instead of creating a second service
+        with _service_lock:
+            if _service is None:
+                _service = TranscriptionService()
+    return _service
\ No newline at end of file